@@ -49,8 +49,16 @@ setup(
         "turberfield-dialogue>=0.39.0",
         "turberfield-utils>=0.38.0",
     ],
-    extras_require={},
+    extras_require={
+        "brotli": ["brotli"],
+    },
     tests_require=[],
-    entry_points={},
+    entry_points={
+        "console_scripts": [
+            "catchphrase-css = turberfield.catchphrase.css.bundle:run",
+            "catchphrase-replay = turberfield.catchphrase.replay:run",
+            "catchphrase-vocab = turberfield.catchphrase.vocabulary:run",
+        ],
+    },
     zip_safe=False
 )
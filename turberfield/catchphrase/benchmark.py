@@ -0,0 +1,683 @@
+#!/usr/bin/env python3
+# encoding: UTF-8
+
+# This file is part of turberfield.
+#
+# Turberfield is free software: you can redistribute it and/or modify it
+# under the terms of the GNU General Public License as published
+# by the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# Turberfield is distributed in the hope that it will be useful, but
+# WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with turberfield.  If not, see <http://www.gnu.org/licenses/>.
+
+import argparse
+import enum
+import gc
+import gzip
+import inspect
+import itertools
+import json
+import pathlib
+import platform
+import random
+import re
+import statistics
+import string
+import subprocess
+import sys
+import tempfile
+import time
+import timeit
+import tracemalloc
+import types
+
+import turberfield.catchphrase
+from turberfield.catchphrase.codec import Codec
+from turberfield.catchphrase.state import Impulsive
+from turberfield.catchphrase.state import Net
+from turberfield.catchphrase.matcher import MultiMatcher
+from turberfield.catchphrase.mediator import Mediator
+from turberfield.catchphrase.parser import CommandParser
+from turberfield.catchphrase.presenter import Presenter
+from turberfield.catchphrase.render import Action
+from turberfield.catchphrase.render import Delta
+from turberfield.catchphrase.render import Parameter
+from turberfield.catchphrase.render import Renderer
+from turberfield.catchphrase import worker
+from turberfield.dialogue.model import Model
+from turberfield.dialogue.model import SceneScript
+from turberfield.dialogue.types import DataObject
+
+__doc__ = """
+Microbenchmarks for Catchphrase.
+
+Usage::
+
+    python -m turberfield.catchphrase.benchmark [name ...] [--json results.json] [--compare baseline.json]
+
+The `turns` suite times each stage of a full turn with synthetic stories, scaled by
+ensemble size, method count, docstring alternatives and dialogue length.
+
+The `imports` suite runs `python -X importtime` in a fresh interpreter for each module of
+the package. It reports the time to import the module and the number of modules loaded.
+Modules which do not render or present dialogue should not load `turberfield.dialogue.model`
+or docutils.
+Save results from one version and compare them with the next to find regressions.
+
+"""
+
+
+def legacy_line_to_html(anim):
+    # Renderer.animated_line_to_html prior to 0.26.0
+    name = anim.element.persona.name if hasattr(anim.element.persona, "name") else ""
+    name = "{0.firstname} {0.surname}".format(name) if hasattr(name, "firstname") else name
+    if getattr(anim.element.persona, "history", []):
+        tag = '<blockquote class="catchphrase-method-{0}">'.format(
+            anim.element.persona.history[0].name.lower()
+        )
+    else:
+        tag = "<blockquote>"
+    return f"""
+<li style="animation-delay: {anim.delay:.2f}s; animation-duration: {anim.duration:.2f}s">
+{tag}
+<header>{name}</header>
+{anim.element.html}
+</blockquote>
+</li>"""
+
+
+class Segments:
+    """
+    A template compiled to static byte segments with slots, assembled by `bytes.join`.
+    Kept for comparison with the f-strings of the Renderer.
+
+    """
+
+    def __init__(self, template, encoding="utf-8"):
+        self.encoding = encoding
+        self.segments = []
+        self.slots = []
+        for literal, field, spec, conversion in string.Formatter().parse(template):
+            if literal:
+                self.segments.append(literal.encode(encoding))
+            if field is not None:
+                self.slots.append((len(self.segments), field, spec))
+                self.segments.append(b"")
+
+    def __call__(self, **kwargs):
+        segments = self.segments.copy()
+        for n, name, spec in self.slots:
+            segments[n] = format(kwargs[name], spec).encode(self.encoding)
+        return b"".join(segments)
+
+
+line_segments = Segments("""
+<li style="animation-delay: {delay:.2f}s; animation-duration: {duration:.2f}s">
+{tag}
+<header>{name}</header>
+{html}
+</blockquote>
+</li>""")
+
+
+def segmented_line_to_html(anim):
+    element = anim.element
+    name = getattr(element.persona, "name", "")
+    name = f"{name.firstname} {name.surname}" if hasattr(name, "firstname") else name
+    history = getattr(element.persona, "history", None)
+    tag = f'<blockquote class="catchphrase-method-{history[0].name.lower()}">' if history else "<blockquote>"
+    return line_segments(delay=anim.delay, duration=anim.duration, tag=tag, name=name, html=element.html)
+
+
+def synthetic_lines(n):
+    persona = types.SimpleNamespace(name=types.SimpleNamespace(firstname="Ann", surname="Other"))
+    return [
+        Presenter.Animation(
+            n * 1.3, 1.3,
+            Model.Line(persona, "Line {0}.".format(n), "<p>Line {0}.</p>".format(n), "inline", n)
+        )
+        for n in range(n)
+    ]
+
+
+def measure(fn, number, repeat):
+    """Return the best rate in calls per second."""
+    return number / min(timeit.repeat(fn, number=number, repeat=repeat))
+
+
+def bench_fragments(number=200, repeat=5, lines=50):
+    """Per-line throughput of rendering dialogue to encoded HTML."""
+    anims = synthetic_lines(lines)
+    return {
+        "lines_per_s_legacy": lines * measure(
+            lambda: b"\n".join(legacy_line_to_html(i).encode("utf-8") for i in anims), number, repeat
+        ),
+        "lines_per_s_renderer": lines * measure(
+            lambda: b"\n".join(Renderer.animated_line_to_html(i).encode("utf-8") for i in anims), number, repeat
+        ),
+        "lines_per_s_segments": lines * measure(
+            lambda: b"\n".join(segmented_line_to_html(i) for i in anims), number, repeat
+        ),
+    }
+
+
+def bench_delta(number=200, repeat=5, lines=50, step=5):
+    """Bytes and turns per second of a session sent as full pages or as patches."""
+    anims = synthetic_lines(lines)
+    frames = [
+        {Model.Line: anims[:n], Model.Audio: [], Model.Video: [], Model.Still: []}
+        for n in range(step, lines + 1, step)
+    ]
+    controls = ["<button>Go</button>"]
+    style = Renderer.render_dict_to_css({"ink": "black"})
+
+    def full():
+        return [Delta().page(i, controls, style=style, title="Benchmark") for i in frames]
+
+    def delta():
+        renderer = Delta()
+        return [renderer.render(i, controls, style=style, title="Benchmark")[1] for i in frames]
+
+    return {
+        "bytes_per_turn_full": statistics.mean(len(i.encode("utf-8")) for i in full()),
+        "bytes_per_turn_delta": statistics.mean(len(i.encode("utf-8")) for i in delta()),
+        "sessions_per_s_full": measure(full, max(1, number // 10), repeat),
+        "sessions_per_s_delta": measure(delta, max(1, number // 10), repeat),
+    }
+
+
+def bench_codec(number=200, repeat=5, lines=20):
+    """Bytes per frame and frames encoded per second as HTML, JSON and binary."""
+    frame = {
+        "name": "shot", "scene": "benchmark",
+        Model.Line: synthetic_lines(lines), Model.Audio: [], Model.Video: [], Model.Still: [],
+    }
+    encoders = {
+        "html": lambda: Renderer.render_animated_frame_to_html(frame).encode("utf-8"),
+        "json": lambda: Codec.encode_json(frame).encode("utf-8"),
+        "binary": lambda: Codec.encode_binary(frame),
+    }
+    rv = {}
+    for name, fn in encoders.items():
+        data = fn()
+        rv["bytes_" + name] = len(data)
+        rv["bytes_gzip_" + name] = len(gzip.compress(data))
+        rv["frames_per_s_" + name] = measure(fn, number, repeat)
+    return rv
+
+
+def synthetic_action(n):
+    return Action(
+        name="cmd", rel="canonical", typ="/{0}/cmd/", ref=(n,), method="post",
+        parameters=[
+            Parameter("cmd", True, re.compile("[\\w ]+"), [], "Enter a command"),
+            Parameter("name", False, None, ["Anon"], "Your name."),
+            Parameter("colour", False, None, ["red", "green", "blue"], "Pick one."),
+        ],
+        prompt="Enter"
+    )
+
+
+def bench_forms(number=200, repeat=5, forms=50):
+    """Action forms rendered per second, with and without the compiled form cache."""
+    actions = [synthetic_action(n) for n in range(forms)]
+
+    def cold():
+        for action in actions:
+            Renderer.compile_action_form.cache_clear()
+            "\n".join(Renderer.render_action_form(action, autofocus=True))
+
+    def warm():
+        for action in actions:
+            "\n".join(Renderer.render_action_form(action, autofocus=True))
+
+    Renderer.compile_action_form.cache_clear()
+    rv = {
+        "forms_per_s_uncached": forms * measure(cold, number, repeat),
+        "forms_per_s_cached": forms * measure(warm, number, repeat),
+    }
+    rv["cache_hits"], rv["cache_misses"] = Renderer.compile_action_form.cache_info()[:2]
+    return rv
+
+
+def legacy_parse_tokens(text, preserver=".", discard=None):
+    # CommandParser.parse_tokens prior to 0.26.0
+    discard = discard or set()
+    return [
+        i.strip()
+        for i in text.rstrip(preserver).lower().split()
+        if i not in discard or text.endswith(preserver)
+    ]
+
+
+def legacy_expand_commands(method):
+    # CommandParser.expand_commands prior to 0.26.0, for methods annotated with enums only
+    doc = method.func.__doc__ if hasattr(method, "func") else method.__doc__
+    terms = list(filter(None, (i.strip() for line in doc.splitlines() for i in line.split("|"))))
+    params = [
+        [(p.name, i) for i in p.annotation for v in ([i.value] if isinstance(i.value, str) else i.value)]
+        for p in inspect.signature(method, follow_wrapped=True).parameters.values()
+        if p.annotation != inspect.Parameter.empty
+    ]
+    cartesian = [dict(i) for i in itertools.product(*params)]
+    for term in terms:
+        tokens = legacy_parse_tokens(term, discard=CommandParser.discard)
+        for prod in cartesian:
+            try:
+                yield (" ".join(tokens).format(**prod).lower(), (method, prod))
+            except (AttributeError, IndexError, KeyError):
+                continue
+
+
+class Colour(enum.Enum):
+    red = ["red", "scarlet"]
+    green = ["green", "emerald"]
+    blue = ["blue", "azure"]
+    black = "black"
+
+
+class Size(enum.Enum):
+    small = ["small", "little"]
+    large = ["large", "big"]
+
+
+def bench_enums(number=200, repeat=5):
+    """Expansions per second of a method whose parameters are all enums."""
+
+    def paint(self, this, text, context, colour: Colour, size: Size):
+        """
+        paint the {size.name} box {colour.name}
+        make {size.name} box {colour.name} | colour {size.name} box {colour.name}
+        """
+
+    return {
+        "expansions_per_s_legacy": measure(lambda: list(legacy_expand_commands(paint)), number, repeat),
+        "expansions_per_s_static": measure(lambda: list(CommandParser.expand_commands(paint)), number, repeat),
+    }
+
+
+def bench_tokens(number=200, repeat=5):
+    """Texts tokenized per second by the previous function and by the Tokenizer."""
+    texts = [
+        "Pick up the {obj.names[0]}", "look", "Go north", "give the red apple to my friend",
+        "Examine their strange device.", "put a spoon in the tea cup", "help", "drop it",
+    ] * 8
+    tokenizer = CommandParser.tokenizer
+    return {
+        "texts_per_s_legacy": len(texts) * measure(
+            lambda: [legacy_parse_tokens(i, discard=CommandParser.discard) for i in texts], number, repeat
+        ),
+        "texts_per_s_parse_tokens": len(texts) * measure(
+            lambda: [CommandParser.parse_tokens(i, discard=CommandParser.discard) for i in texts], number, repeat
+        ),
+        "texts_per_s_tokenizer": len(texts) * measure(
+            lambda: [tokenizer.tokens(i) for i in texts], number, repeat
+        ),
+    }
+
+
+class Thing(DataObject):
+    pass
+
+
+def synthetic_mediator(methods, alternatives):
+    """Create a Mediator class with methods which each accept several phrasings."""
+
+    def build(n):
+        def method(self, this, text, context, obj: Thing):
+            yield "You use the {0}.".format(obj.names[0])
+
+        method.__name__ = "do_{0:03d}".format(n)
+        method.__doc__ = "\n".join(
+            "verb{0}x{1} the {{obj.names[0]}}".format(n, a) for a in range(alternatives)
+        )
+        return method
+
+    attrs = {i.__name__: i for i in (build(n) for n in range(methods))}
+    return type("Story", (Mediator,), attrs)
+
+
+def synthetic_dialogue(lines):
+    return "\n".join([
+        ".. entity:: NARRATOR",
+        "   :types: {0}.Thing".format(__name__),
+        "",
+        "Scene",
+        "=====",
+        "",
+        "Shot",
+        "----",
+        "",
+    ] + [
+        "[NARRATOR]_\n\n    Line {0}. {{0}}\n".format(n) for n in range(lines)
+    ])
+
+
+def synthetic_story(ensemble=8, methods=8, alternatives=4, lines=10, seed=0):
+    rng = random.Random(seed)
+    things = [Thing(names=["thing{0:03d}".format(n)]) for n in range(ensemble)]
+    story = synthetic_mediator(methods, alternatives)
+    mediator = story(*(i for i in vars(story) if i.startswith("do_")))
+    commands = [
+        "verb{0}x{1} the {2}".format(
+            rng.randrange(methods), rng.randrange(alternatives), rng.choice(things).names[0]
+        )
+        for i in range(64)
+    ]
+    return mediator, things, commands, synthetic_dialogue(lines)
+
+
+def turn(mediator, ensemble, command, paths, timer=time.perf_counter):
+    """Run one turn of the pipeline. Return the time at the end of each stage."""
+    rv = [timer()]
+    fn, args, kwargs = mediator.interpret(mediator.match(command, ensemble=ensemble))
+    rv.append(timer())
+    data = mediator(fn, *args, **kwargs)
+    rv.append(timer())
+    presenter = Presenter.build_presenter(paths, data, facts=mediator.facts, ensemble=ensemble)
+    rv.append(timer())
+    frames = [presenter.animate(i, dwell=presenter.dwell, pause=presenter.pause) for i in presenter.frames]
+    rv.append(timer())
+    [Renderer.render_animated_frame_to_html(i) for i in frames if i]
+    rv.append(timer())
+    return rv
+
+
+def memory_mark():
+    """Return current and peak traced memory, then reset the peak."""
+    rv = tracemalloc.get_traced_memory()
+    tracemalloc.reset_peak()
+    return rv
+
+
+stages = ("match", "call", "build_presenter", "animate", "render")
+
+
+def percentiles(values):
+    cuts = statistics.quantiles(values, n=100, method="inclusive") if len(values) > 1 else values * 99
+    return {"p50": cuts[49], "p90": cuts[89], "p99": cuts[98], "max": max(values)}
+
+
+def bench_turn(number=200, repeat=5, ensemble=8, methods=8, alternatives=4, lines=10):
+    """
+    Latency percentiles in ms and peak allocations in bytes for each stage of a turn.
+    Each stage reports the round of `number` turns with the lowest median, out of `repeat`.
+
+    """
+    mediator, things, commands, text = synthetic_story(ensemble, methods, alternatives, lines)
+    with tempfile.TemporaryDirectory() as parent:
+        path = pathlib.Path(parent, "dialogue.rst")
+        path.write_text(text, encoding="utf-8")
+        paths = [str(path)]
+
+        rounds = [
+            [turn(mediator, things, commands[n % len(commands)], paths) for n in range(number)]
+            for r in range(max(1, repeat))
+        ]
+
+        tracemalloc.start()
+        peaks = {i: 0 for i in stages}
+        for n in range(max(1, number // 10)):
+            marks = turn(mediator, things, commands[n % len(commands)], paths, timer=memory_mark)
+            for i, stage in enumerate(stages):
+                peaks[stage] = max(peaks[stage], marks[i + 1][1] - marks[i][0])
+        tracemalloc.stop()
+
+    Presenter.load_dialogue.cache_clear()
+    return {
+        stage: dict(
+            min(
+                (percentiles([1000 * (i[n + 1] - i[n]) for i in timings]) for timings in rounds),
+                key=lambda x: x["p50"]
+            ),
+            peak_bytes=peaks[stage]
+        )
+        for n, stage in enumerate(stages)
+    }
+
+
+def bench_turns(number=200, repeat=5):
+    """End-to-end turns of a synthetic story, scaling each dimension in turn."""
+    base = dict(ensemble=8, methods=8, alternatives=4, lines=10)
+    scales = [base] + [
+        dict(base, **{k: v}) for k, v in [
+            ("ensemble", 32), ("ensemble", 128),
+            ("methods", 32),
+            ("alternatives", 16),
+            ("lines", 100),
+        ]
+    ]
+    return {
+        "e{ensemble}_m{methods}_a{alternatives}_l{lines}".format(**i): bench_turn(number, repeat, **i)
+        for i in scales
+    }
+
+
+def work(n, mediator, ensemble, commands, paths, turns):
+    for i in range(turns):
+        turn(mediator, ensemble, commands[(n + i) % len(commands)], paths)
+
+
+def bench_workers(number=200, repeat=5, counts=(1, 2, 4, 8)):
+    """Memory in kB of forked workers which share preloaded dialogue."""
+    mediator, things, commands, text = synthetic_story(ensemble=64, methods=16, alternatives=4, lines=400)
+    rv = {}
+    with tempfile.TemporaryDirectory() as parent:
+        path = pathlib.Path(parent, "dialogue.rst")
+        path.write_text(text, encoding="utf-8")
+        paths = [str(path)]
+        folder = SceneScript.Folder(pkg=None, description="", metadata={}, paths=paths, interludes=None)
+        worker.preload([folder], [type(mediator)])
+        try:
+            for count in counts:
+                results = worker.fork(
+                    work, mediator, things, commands, paths, min(number, 10), workers=count
+                )
+                usage = [i[2] for i in results]
+                rv["workers_{0}".format(count)] = {
+                    key: statistics.mean(i.get(key, 0) for i in usage)
+                    for key in ("Rss", "Pss", "Private_Dirty", "MaxRss")
+                }
+        finally:
+            gc.unfreeze()
+            Presenter.load_dialogue.cache_clear()
+    return rv
+
+
+def import_time(module, executable=sys.executable):
+    """
+    Import a module in a fresh interpreter.
+    Return the time taken in microseconds and the names of the modules it loaded.
+
+    """
+    proc = subprocess.run(
+        [executable, "-X", "importtime", "-c", "import {0}".format(module)],
+        capture_output=True, text=True, check=True
+    )
+    rv = 0
+    names = []
+    for line in proc.stderr.splitlines():
+        fields = line.partition(":")[2].split("|")
+        if len(fields) != 3 or not fields[1].strip().isdigit():
+            continue
+        name = fields[2][1:]
+        names.append(name.strip())
+        if name == name.lstrip() and name.split(".")[0] == module.split(".")[0]:
+            # Top level imports of the package and its parents
+            rv += int(fields[1])
+    return rv, names
+
+
+def bench_imports(number=200, repeat=5, modules=(
+    "parser", "mediator", "state", "ensemble", "codec", "render", "worker", "replay", "presenter"
+)):
+    """Milliseconds to import each module in a fresh interpreter, and the number of modules loaded."""
+    rv = {}
+    for name in modules:
+        times, names = zip(*(import_time("turberfield.catchphrase." + name) for i in range(repeat)))
+        rv[name] = {"ms": min(times) / 1000, "modules": len(names[0])}
+    return rv
+
+
+def synthetic_folders(n, seed=0):
+    """Create folders with arcs, pathways and time windows over a clock of 1000 ticks."""
+    rng = random.Random(seed)
+    rv = []
+    for i in range(n):
+        start = rng.randrange(1000)
+        metadata = {
+            "arc": "arc_{0:03d}".format(i % 100),
+            "pathways": frozenset(("zone_{0:02d}".format(rng.randrange(50)), "room_{0}".format(j)) for j in range(2)),
+            "min_t": start,
+            "max_t": start + rng.randrange(1, 50),
+        }
+        rv.append(SceneScript.Folder(pkg=None, description="", metadata=metadata, paths=[], interludes=None))
+    return rv
+
+
+def bench_schedule(number=200, repeat=5, folders=10000):
+    """Scene choices per second as the clock advances, by query and by schedule."""
+    matcher = MultiMatcher(synthetic_folders(folders))
+    pathways = {("zone_07", "room_0"), ("zone_07", "room_1")}
+    clock = itertools.count()
+    schedule = matcher.schedule(arc="arc_042", t=0, pathways=pathways)
+    return {
+        "turns_per_s_options": measure(
+            lambda: list(matcher.options(arc="arc_042", t=next(clock) % 1000, pathways=pathways)),
+            max(1, number // 20), repeat
+        ),
+        "turns_per_s_schedule": measure(
+            lambda: schedule.advance(next(clock) % 1000), number, repeat
+        ),
+    }
+
+
+class Phase(enum.Enum):
+    idle = enum.auto()
+    busy = enum.auto()
+    resting = enum.auto()
+
+    __transitions__ = [("idle", "busy", 40), ("busy", "resting", 25), ("resting", "idle", 60)]
+
+
+class Agent(Impulsive, DataObject):
+    pass
+
+
+def synthetic_agents(size, seed=0):
+    """Create agents whose states were entered at staggered ticks before now."""
+    rng = random.Random(seed)
+    clock = Impulsive.clock
+    rv = []
+    for n in range(size):
+        Impulsive.clock = clock - rng.randrange(60)
+        rv.append(Agent().set_state(rng.choice(list(Phase))))
+    Impulsive.clock = clock
+    return rv
+
+
+def bench_net(number=200, repeat=5, sizes=(100, 1000, 10000)):
+    """Ticks per second of a Petri net over ensembles, examining every entity or only those due."""
+    rv = {}
+    clock = Impulsive.clock
+    try:
+        for size in sizes:
+            Impulsive.clock = 0
+            agents = synthetic_agents(size, seed=size)
+            net = Net(Phase)
+            step = measure(lambda: net.step(agents), max(1, number // 20), repeat)
+
+            Impulsive.clock = 0
+            net = Net(Phase).add(*synthetic_agents(size, seed=size))
+            firings = []
+            tick = measure(lambda: firings.extend(net.tick()), number, repeat)
+            rv["ensemble_{0}".format(size)] = {
+                "ticks_per_s_step": step,
+                "ticks_per_s_tick": tick,
+                "firings_per_tick": len(firings) / (Impulsive.clock or 1),
+            }
+    finally:
+        Impulsive.clock = clock
+    return rv
+
+
+def flatten(data, prefix=""):
+    for k, v in data.items():
+        if isinstance(v, dict):
+            yield from flatten(v, prefix + k + ".")
+        elif isinstance(v, (int, float)):
+            yield prefix + k, v
+
+
+def compare(baseline, results):
+    """Generate the ratio of each result to its value in a baseline."""
+    old = dict(flatten(baseline))
+    for k, v in flatten(results):
+        if old.get(k):
+            yield k, old[k], v, v / old[k]
+
+
+benchmarks = {
+    "codec": bench_codec,
+    "fragments": bench_fragments,
+    "delta": bench_delta,
+    "forms": bench_forms,
+    "imports": bench_imports,
+    "enums": bench_enums,
+    "net": bench_net,
+    "schedule": bench_schedule,
+    "tokens": bench_tokens,
+    "turns": bench_turns,
+    "workers": bench_workers,
+}
+
+
+def main(args):
+    rv = {name: benchmarks[name](number=args.number, repeat=args.repeat) for name in args.names}
+    rv["meta"] = {
+        "version": turberfield.catchphrase.__version__,
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+    }
+    print(json.dumps(rv, indent=4), file=sys.stdout)
+    if args.json:
+        with open(args.json, "w") as output:
+            json.dump(rv, output, indent=4)
+    if args.compare:
+        with open(args.compare, "r") as baseline:
+            for key, old, new, ratio in compare(json.load(baseline), rv):
+                print("{0:<64} {1:>14.4f} {2:>14.4f} {3:>7.2f}".format(key, old, new, ratio), file=sys.stdout)
+    return 0
+
+
+def parser():
+    rv = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    rv.add_argument(
+        "names", nargs="*", default=list(benchmarks),
+        help="Select benchmarks to run from {0} [all].".format(", ".join(benchmarks))
+    )
+    rv.add_argument("--number", type=int, default=200, help="Iterations per timing [%(default)s].")
+    rv.add_argument("--repeat", type=int, default=5, help="Timings per benchmark [%(default)s].")
+    rv.add_argument("--json", default=None, help="Save results to a JSON file.")
+    rv.add_argument("--compare", default=None, help="Compare results with those in a JSON file.")
+    return rv
+
+
+def run():
+    p = parser()
+    args = p.parse_args()
+    unknown = set(args.names) - set(benchmarks)
+    if unknown:
+        p.error("unknown benchmark: {0}".format(", ".join(sorted(unknown))))
+    rv = main(args)
+    sys.exit(rv)
+
+
+if __name__ == "__main__":
+    run()
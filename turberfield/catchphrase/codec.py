@@ -0,0 +1,178 @@
+#!/usr/bin/env python3
+# encoding: UTF-8
+
+# This file is part of turberfield.
+#
+# Turberfield is free software: you can redistribute it and/or modify it
+# under the terms of the GNU General Public License as published
+# by the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# Turberfield is distributed in the hope that it will be useful, but
+# WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with turberfield.  If not, see <http://www.gnu.org/licenses/>.
+
+import json
+
+__doc__ = """
+Serialize animated frames for clients which do not display HTML.
+
+A frame becomes a dictionary with the name of its shot and scene, and a list of records for
+each kind of element. A record is a list of values in the order given by `Codec.fields`.
+The first two values are the delay and duration of its animation in whole milliseconds.
+All other values are strings, or null when absent.
+
+The JSON encoding is one compact object per frame. Frames are streamed as JSON lines.
+
+The binary encoding has a header of `CPF` and a version byte, followed by the name, the scene
+and then each kind of element in the order of `Codec.fields`. Each kind is a count of its records.
+Integers are unsigned LEB128 varints. A string is a varint of one more than its length
+in UTF-8 bytes, then those bytes. Null is a single zero byte.
+Frames are streamed each prefixed with a varint of their length.
+
+"""
+
+
+class Codec:
+
+    version = 1
+    magic = b"CPF"
+
+    fields = {
+        "lines": ("delay", "duration", "persona", "text", "html"),
+        "stills": ("delay", "duration", "package", "resource", "label", "width", "height", "loop"),
+        "audio": ("delay", "duration", "package", "resource", "loop"),
+        "video": (
+            "delay", "duration", "package", "resource", "label", "width", "height", "poster", "url", "loop"
+        ),
+    }
+    kinds = {"lines": "Line", "stills": "Still", "audio": "Audio", "video": "Video"}
+
+    # Lines are animated in seconds. Media keep the offset and duration of their directive in ms.
+    scale = {"lines": 1000, "stills": 1, "audio": 1, "video": 1}
+
+    @staticmethod
+    def persona(element):
+        name = getattr(element.persona, "name", "")
+        return f"{name.firstname} {name.surname}" if hasattr(name, "firstname") else str(name)
+
+    @staticmethod
+    def text(value):
+        return None if value is None else str(value)
+
+    @classmethod
+    def record(cls, kind, anim):
+        element = anim.element
+        scale = cls.scale[kind]
+        rv = [round(scale * float(anim.delay or 0)), round(scale * float(anim.duration or 0))]
+        for field in cls.fields[kind][2:]:
+            if field == "persona":
+                rv.append(cls.persona(element))
+            else:
+                rv.append(cls.text(getattr(element, field, None)))
+        return rv
+
+    @classmethod
+    def frame_to_dict(cls, frame):
+        """ Return the schema of an animated frame as a dictionary."""
+        from turberfield.dialogue.model import Model
+        rv = {"name": cls.text(frame.get("name")), "scene": cls.text(frame.get("scene"))}
+        for kind, name in cls.kinds.items():
+            rv[kind] = [cls.record(kind, anim) for anim in frame.get(getattr(Model, name), [])]
+        return rv
+
+    @classmethod
+    def encode_json(cls, frame):
+        return json.dumps(cls.frame_to_dict(frame), separators=(",", ":"), ensure_ascii=False)
+
+    @classmethod
+    def stream_json(cls, frames, encoding="utf-8"):
+        """ Generate each frame as an encoded line of JSON."""
+        for frame in frames:
+            yield (cls.encode_json(frame) + "\n").encode(encoding)
+
+    @staticmethod
+    def pack_int(n, buf):
+        while n > 0x7F:
+            buf.append(0x80 | (n & 0x7F))
+            n >>= 7
+        buf.append(n)
+
+    @staticmethod
+    def pack_str(text, buf):
+        if text is None:
+            buf.append(0)
+        else:
+            data = text.encode("utf-8")
+            Codec.pack_int(len(data) + 1, buf)
+            buf += data
+
+    @classmethod
+    def encode_binary(cls, frame):
+        data = cls.frame_to_dict(frame)
+        buf = bytearray(cls.magic)
+        buf.append(cls.version)
+        cls.pack_str(data["name"], buf)
+        cls.pack_str(data["scene"], buf)
+        for kind in cls.fields:
+            records = data[kind]
+            cls.pack_int(len(records), buf)
+            for delay, duration, *values in records:
+                cls.pack_int(delay, buf)
+                cls.pack_int(duration, buf)
+                for value in values:
+                    cls.pack_str(value, buf)
+        return bytes(buf)
+
+    @classmethod
+    def stream_binary(cls, frames):
+        """ Generate each frame in binary, prefixed by its length."""
+        for frame in frames:
+            data = cls.encode_binary(frame)
+            buf = bytearray()
+            cls.pack_int(len(data), buf)
+            yield bytes(buf) + data
+
+    @staticmethod
+    def unpack_int(data, pos):
+        rv = shift = 0
+        while True:
+            byte = data[pos]
+            pos += 1
+            rv |= (byte & 0x7F) << shift
+            if byte < 0x80:
+                return rv, pos
+            shift += 7
+
+    @staticmethod
+    def unpack_str(data, pos):
+        size, pos = Codec.unpack_int(data, pos)
+        if not size:
+            return None, pos
+        return data[pos:pos + size - 1].decode("utf-8"), pos + size - 1
+
+    @classmethod
+    def decode_binary(cls, data):
+        """ Return the dictionary of a frame from its binary encoding."""
+        if data[:3] != cls.magic or data[3] != cls.version:
+            raise ValueError("Not a frame of version {0}".format(cls.version))
+        pos = 4
+        name, pos = cls.unpack_str(data, pos)
+        scene, pos = cls.unpack_str(data, pos)
+        rv = {"name": name, "scene": scene}
+        for kind, fields in cls.fields.items():
+            count, pos = cls.unpack_int(data, pos)
+            rv[kind] = []
+            for n in range(count):
+                delay, pos = cls.unpack_int(data, pos)
+                duration, pos = cls.unpack_int(data, pos)
+                record = [delay, duration]
+                for field in fields[2:]:
+                    value, pos = cls.unpack_str(data, pos)
+                    record.append(value)
+                rv[kind].append(record)
+        return rv
@@ -0,0 +1,106 @@
+#!/usr/bin/env python3
+# encoding: UTF-8
+
+# This file is part of turberfield.
+#
+# Turberfield is free software: you can redistribute it and/or modify it
+# under the terms of the GNU General Public License as published
+# by the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# Turberfield is distributed in the hope that it will be useful, but
+# WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with turberfield.  If not, see <http://www.gnu.org/licenses/>.
+
+import argparse
+import gzip
+import hashlib
+import importlib.resources
+import json
+import pathlib
+import re
+import sys
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+__doc__ = """
+Build minified, content-hashed and precompressed copies of the Catchphrase stylesheet.
+
+The output directory receives a file named like `catchphrase.0123456789ab.css`,
+together with `.gz` and (if the brotli package is installed) `.br` variants.
+A `manifest.json` maps the original file name to the hashed one.
+These files never change, so may be served with a long cache lifetime.
+
+"""
+
+comments = re.compile(r"/\*.*?\*/", re.DOTALL)
+spaces = re.compile(r"\s+")
+punctuation = re.compile(r"\s*([{};,])\s*")
+
+
+def minify(text):
+    text = comments.sub("", text)
+    text = spaces.sub(" ", text)
+    text = punctuation.sub(r"\1", text)
+    text = text.replace(": ", ":").replace(";}", "}")
+    return text.strip()
+
+
+def build(output, name="catchphrase.css", pkg="turberfield.catchphrase.css", digits=12):
+    """
+    Write the bundle for a stylesheet resource to the output directory.
+    Return the manifest as a dictionary.
+
+    """
+    output = pathlib.Path(output)
+    output.mkdir(parents=True, exist_ok=True)
+    text = importlib.resources.files(pkg).joinpath(name).read_text(encoding="utf-8")
+    data = minify(text).encode("utf-8")
+    stem, suffix = name.rsplit(".", 1)
+    hashed = "{0}.{1}.{2}".format(stem, hashlib.sha256(data).hexdigest()[:digits], suffix)
+
+    output.joinpath(hashed).write_bytes(data)
+    output.joinpath(hashed + ".gz").write_bytes(gzip.compress(data, compresslevel=9, mtime=0))
+    if brotli is not None:
+        output.joinpath(hashed + ".br").write_bytes(brotli.compress(data, quality=11))
+
+    manifest_path = output.joinpath("manifest.json")
+    try:
+        rv = json.loads(manifest_path.read_text(encoding="utf-8"))
+    except FileNotFoundError:
+        rv = {}
+    rv[name] = hashed
+    manifest_path.write_text(json.dumps(rv, indent=0, sort_keys=True), encoding="utf-8")
+    return rv
+
+
+def main(args):
+    manifest = build(args.output)
+    print(json.dumps(manifest), file=sys.stdout)
+    if brotli is None:
+        print("Brotli is not installed. No .br files were written.", file=sys.stderr)
+    return 0
+
+
+def parser():
+    rv = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    rv.add_argument("output", help="Set a directory for the bundled files.")
+    return rv
+
+
+def run():
+    p = parser()
+    args = p.parse_args()
+    rv = main(args)
+    sys.exit(rv)
+
+
+if __name__ == "__main__":
+    run()
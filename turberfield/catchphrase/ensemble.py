@@ -0,0 +1,112 @@
+#!/usr/bin/env python3
+# encoding: UTF-8
+
+# This file is part of turberfield.
+#
+# Turberfield is free software: you can redistribute it and/or modify it
+# under the terms of the GNU General Public License as published
+# by the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# Turberfield is distributed in the hope that it will be useful, but
+# WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with turberfield.  If not, see <http://www.gnu.org/licenses/>.
+
+import abc
+from collections import defaultdict
+import collections.abc
+
+__doc__ = """
+An indexed sequence of the entities in a story.
+
+The parser and the presenter accept any sequence as an ensemble. They scan it once
+for every parameter or role they fill. An `Ensemble` keeps the entities in columns of
+names and types, with indexes from each to the positions of the entities. Lookups return
+entities in their original order, so an Ensemble may replace a list without changing results.
+
+The membership of an Ensemble is fixed. Entity states may change at any time, so indexes of
+state are built on demand and kept until `refresh` is called.
+
+"""
+
+
+class Ensemble(collections.abc.Sequence):
+
+    def __init__(self, items=()):
+        self.items = list(items)
+        self.names = [self.name(i) for i in self.items]
+        self.types = [type(i) for i in self.items]
+        self.by_name = defaultdict(list)
+        self.by_type = defaultdict(list)
+        for n, (name, typ) in enumerate(zip(self.names, self.types)):
+            if name is not None:
+                self.by_name[name.lower()].append(n)
+            for cls in typ.__mro__:
+                if not isinstance(cls, abc.ABCMeta):
+                    self.by_type[cls].append(n)
+        self.by_type = dict(self.by_type)
+        self.by_state = {}
+
+    @staticmethod
+    def name(obj):
+        """Return the first of the names of an entity, or its name, or None."""
+        return next(iter(getattr(obj, "names", None) or []), getattr(obj, "name", None))
+
+    def __getitem__(self, n):
+        return self.items[n]
+
+    def __len__(self):
+        return len(self.items)
+
+    def __iter__(self):
+        return iter(self.items)
+
+    def __repr__(self):
+        return "<{0}> {1!r}".format(type(self).__name__, self.items)
+
+    def positions(self, typ):
+        """Return the positions of entities which are instances of a type or tuple of types."""
+        if isinstance(typ, tuple):
+            return sorted({n for t in typ for n in self.positions(t)})
+        try:
+            return self.by_type[typ]
+        except KeyError:
+            rv = self.by_type[typ] = [n for n, i in enumerate(self.items) if isinstance(i, typ)]
+            return rv
+
+    def of_type(self, typ):
+        """Return a list of entities which are instances of a type or tuple of types."""
+        return [self.items[n] for n in self.positions(typ)]
+
+    def named(self, name):
+        """Return a list of entities whose name matches, ignoring case."""
+        return [self.items[n] for n in self.by_name.get(name.lower(), [])]
+
+    def states(self, typ):
+        """Return a column of the state of each entity for a state type, or None."""
+        return [getattr(i, "get_state", lambda t, d: d)(typ, None) for i in self.items]
+
+    def in_state(self, state):
+        """Return a list of entities whose state of that type has this value."""
+        typ = type(state)
+        try:
+            index = self.by_state[typ]
+        except KeyError:
+            index = self.by_state[typ] = defaultdict(list)
+            for n, value in enumerate(self.states(typ)):
+                if value is not None:
+                    index[value].append(n)
+        return [self.items[n] for n in index.get(state, [])]
+
+    def at(self, location):
+        """Return an Ensemble of the entities whose state is the location."""
+        return type(self)(self.in_state(location))
+
+    def refresh(self):
+        """Discard the indexes of state. Call this once the states of entities have changed."""
+        self.by_state.clear()
+        return self
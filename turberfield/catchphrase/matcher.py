@@ -17,8 +17,11 @@
 # along with turberfield.  If not, see <http://www.gnu.org/licenses/>.
 
 
+import bisect
+from collections import defaultdict
 import datetime
 import logging
+import numbers
 
 from turberfield.dialogue.directives import Entity
 from turberfield.dialogue.directives import Pathfinder
@@ -27,6 +30,133 @@ from turberfield.dialogue.model import SceneScript
 from turberfield.utils.misc import group_by_type
 
 
+class Schedule:
+    """
+    Keeps the folders which are eligible for a clock time, a story arc and a set of pathways.
+
+    Folders are indexed once, so that changing the arc or pathways is a lookup,
+    and advancing the clock only visits folders whose time window opens or closes.
+    The results are the same as those of `MultiMatcher.options`, in folder order.
+
+    """
+
+    def __init__(self, folders, arc=None, t=None, pathways=None):
+        self.folders = list(folders)
+        self.arcs = defaultdict(list)
+        self.routes = defaultdict(list)
+        self.timeless = []
+        self.windows = {}
+        self.groups = defaultdict(list)
+        for n, folder in enumerate(self.folders):
+            metadata = folder.metadata
+            self.arcs[metadata.get("arc", "")].append(n)
+            for pathway in metadata.get("pathways", set()):
+                self.routes[pathway].append(n)
+
+            if "min_t" not in metadata and "max_t" not in metadata:
+                self.timeless.append(n)
+                continue
+
+            min_t, max_t = metadata.get("min_t"), metadata.get("max_t")
+            kinds = {self.kind(i) for i in (min_t, max_t) if i is not None}
+            if len(kinds) != 1 or None in [metadata[k] for k in ("min_t", "max_t") if k in metadata]:
+                continue
+            try:
+                if min_t is not None and max_t is not None and min_t > max_t:
+                    continue
+            except TypeError:
+                continue
+            kind = kinds.pop()
+            self.windows[n] = (min_t, max_t)
+            self.groups[kind].append(n)
+
+        self.starts = {}
+        self.ends = {}
+        for kind, group in self.groups.items():
+            starts = sorted((self.windows[n][0], n) for n in group if self.windows[n][0] is not None)
+            ends = sorted((self.windows[n][1], n) for n in group if self.windows[n][1] is not None)
+            self.starts[kind] = ([i[0] for i in starts], [i[1] for i in starts])
+            self.ends[kind] = ([i[0] for i in ends], [i[1] for i in ends])
+
+        self.arc = None
+        self.t = None
+        self.pathways = None
+        self.kind_t = None
+        self.started = 0
+        self.ended = 0
+        self.by_arc = set()
+        self.by_pathway = set()
+        self.by_time = set()
+        self._eligible = None
+        self.update(arc=arc, pathways=pathways)
+        self.advance(t)
+
+    @staticmethod
+    def kind(value):
+        """Return a key under which values are mutually comparable."""
+        return numbers.Real if isinstance(value, numbers.Real) else type(value)
+
+    @property
+    def eligible(self):
+        """The list of eligible folders."""
+        if self._eligible is None:
+            self._eligible = [
+                self.folders[n] for n in sorted(self.by_arc | self.by_pathway | self.by_time)
+            ]
+        return self._eligible
+
+    def update(self, arc=None, pathways=None):
+        """Set the arc and pathways. Return the list of eligible folders."""
+        self.arc = arc
+        self.pathways = pathways
+        self.by_arc = set(self.arcs.get(arc, [])) if arc else set()
+        self.by_pathway = {n for p in pathways or [] for n in self.routes.get(p, [])}
+        self._eligible = None
+        return self.eligible
+
+    def opened(self, n, t):
+        min_t = self.windows[n][0]
+        return min_t is None or min_t <= t
+
+    def closed(self, n, t):
+        max_t = self.windows[n][1]
+        return max_t is not None and max_t < t
+
+    def advance(self, t):
+        """Set the clock. Return the list of eligible folders."""
+        kind = self.kind(t)
+        if t is None:
+            self.by_time = set()
+        elif kind != self.kind_t or self.t is None:
+            try:
+                self.by_time = set(self.timeless) if t <= t else set()
+            except TypeError:
+                self.by_time = set()
+            self.by_time.update(
+                n for n in self.groups.get(kind, []) if self.opened(n, t) and not self.closed(n, t)
+            )
+            self.started = bisect.bisect_right(self.starts[kind][0], t) if kind in self.groups else 0
+            self.ended = bisect.bisect_left(self.ends[kind][0], t) if kind in self.groups else 0
+        elif kind in self.groups:
+            (start_keys, start_ids), (end_keys, end_ids) = self.starts[kind], self.ends[kind]
+            started = bisect.bisect_right(start_keys, t)
+            ended = bisect.bisect_left(end_keys, t)
+            if started >= self.started:
+                self.by_time.update(n for n in start_ids[self.started:started] if not self.closed(n, t))
+            else:
+                self.by_time.difference_update(start_ids[started:self.started])
+            if ended >= self.ended:
+                self.by_time.difference_update(end_ids[self.ended:ended])
+            else:
+                self.by_time.update(n for n in end_ids[ended:self.ended] if self.opened(n, t))
+            self.started, self.ended = started, ended
+
+        self.t = t
+        self.kind_t = kind
+        self._eligible = None
+        return self.eligible
+
+
 class MultiMatcher(Matcher):
 
     @staticmethod
@@ -89,3 +219,7 @@ class MultiMatcher(Matcher):
                     yield f
             except TypeError:
                 continue
+
+    def schedule(self, arc=None, t=None, pathways=None):
+        """Return a Schedule of the folders of this matcher."""
+        return Schedule(self.folders, arc=arc, t=t, pathways=pathways)
@@ -20,17 +20,116 @@ import collections.abc
 from collections import defaultdict
 from collections import deque
 from collections import namedtuple
+from collections import OrderedDict
 import difflib
+import heapq
+import inspect
 import itertools
 import random
 import re
+import string
 import textwrap
+import time
 import types
 
+from turberfield.catchphrase import telemetry
 from turberfield.catchphrase.parser import CommandParser
 
 
 
+class Facts(collections.abc.MutableMapping):
+    """
+    A mapping of facts which records the version at which each key last changed.
+
+    Missing keys read as an empty string, as they would from a `defaultdict(str)`.
+    Reading a missing key does not add it to the mapping.
+    Other methods treat missing keys as a dict does.
+
+    """
+
+    missing = object()
+
+    def __init__(self, *args, **kwargs):
+        self.data = {}
+        self.versions = {}
+        self.version = 0
+        self.update(*args, **kwargs)
+
+    def __getitem__(self, key):
+        return self.data.get(key, "")
+
+    def __setitem__(self, key, value):
+        if key not in self.data or self.data[key] != value:
+            self.version += 1
+            self.versions[key] = self.version
+        self.data[key] = value
+
+    def __delitem__(self, key):
+        del self.data[key]
+        self.version += 1
+        self.versions[key] = self.version
+
+    def __contains__(self, key):
+        return key in self.data
+
+    def __iter__(self):
+        return iter(self.data)
+
+    def __len__(self):
+        return len(self.data)
+
+    def __repr__(self):
+        return "<{0} version={1} {2!r}>".format(type(self).__name__, self.version, self.data)
+
+    def get(self, key, default=None):
+        return self.data.get(key, default)
+
+    def pop(self, key, default=missing):
+        if key in self.data:
+            rv = self.data[key]
+            del self[key]
+            return rv
+        elif default is self.missing:
+            raise KeyError(key)
+        return default
+
+    def setdefault(self, key, default=None):
+        if key not in self.data:
+            self[key] = default
+        return self.data[key]
+
+    def changed(self, since=0):
+        """ Return the set of keys which have changed since a version."""
+        return {k for k, v in self.versions.items() if v > since}
+
+    def stamp(self, keys):
+        """ Return a tuple of versions for the keys, suitable for use as a cache key."""
+        return tuple(self.versions.get(k, 0) for k in keys)
+
+
+class Members:
+    """
+    A hashable sequence of objects which compares by their identities.
+    It holds a reference to each object, so their ids are not reused while it is kept as a key.
+
+    """
+
+    __slots__ = ("items", "ids")
+
+    def __init__(self, items=()):
+        self.items = tuple(items)
+        self.ids = tuple(map(id, self.items))
+
+    def __hash__(self):
+        return hash(self.ids)
+
+    def __eq__(self, other):
+        return isinstance(other, Members) and self.ids == other.ids
+
+    def __repr__(self):
+        return "<{0}> {1!r}".format(type(self).__name__, self.items)
+
+
 class Mediator:
 
     """
@@ -52,13 +151,40 @@ class Mediator:
 
     """
     Record = namedtuple("Record", ["name", "args", "kwargs", "result"])
+    CacheInfo = namedtuple("CacheInfo", ["hits", "misses", "maxsize", "currsize"])
+    Candidate = namedtuple("Candidate", ["fn", "args", "kwargs", "score"])
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        cls.compile()
+
+    @classmethod
+    def compile(cls):
+        """
+        Compile the grammar of every method declared with a docstring by this class or its bases.
+        Return a dictionary of Grammars by method name.
 
-    def __init__(self, *args, maxlen=None, serializer=None, **kwargs):
+        Subclasses are compiled when they are defined, so that all their instances share one grammar.
+
+        """
+        return {
+            name: CommandParser.compile(fn)
+            for name, fn in inspect.getmembers(cls, inspect.isfunction)
+            if fn.__doc__ and not hasattr(Mediator, name)
+        }
+
+    def __init__(self, *args, maxlen=None, serializer=None, cache_size=0, budget=None, **kwargs):
         self.active = set(filter(None, (getattr(self, i, None) for i in args)))
+        self.budget = budget or CommandParser.Budget()
         self.serializer = serializer or "\n".join
-        self.facts = defaultdict(str)
+        self.facts = Facts()
         self.history = deque(maxlen=maxlen)
+        self.cache = OrderedDict()
+        self.cache_size = cache_size
+        self.cache_hits = 0
+        self.cache_misses = 0
 
+    @telemetry.timed("mediator.call")
     def __call__(self, fn, *args, **kwargs):
         rv = fn(fn, *args, **kwargs)
         if not isinstance(rv, collections.abc.Sized) and isinstance(rv, collections.abc.Iterable):
@@ -70,23 +196,152 @@ class Mediator:
         return rv
 
     def interpret(self, options):
-        return next(iter(options), (None,) * 3)
+        return tuple(next(iter(options), (None,) * 3))[:3]
 
-    def match(self, text, context=None, ensemble=[], cutoff=0.95):
+    def attributes(self):
         """
-        FIXME: Docs
+        Return a list of the values of the attributes of the mediator which are named by the
+        annotations of active methods. The items of a list value are returned in its place.
+
         """
-        options = defaultdict(list)
-        for fn in self.active:
-            for k, v in CommandParser.expand_commands(fn, ensemble, parent=self):
-                options[k].append(v)
-
-        tokens = CommandParser.parse_tokens(text, discard=CommandParser.discard)
-        matches = (
-            difflib.get_close_matches(" ".join(tokens), options, cutoff=cutoff)
-            or difflib.get_close_matches(text.strip(), options, cutoff=cutoff)
-        )
-        try:
-            yield from ((fn, [text, context], kwargs) for fn, kwargs in options[matches[0]])
-        except (IndexError, KeyError):
+        rv = []
+        formatter = string.Formatter()
+        for fn in sorted(self.active, key=lambda x: x.__name__):
+            for name, annotation in CommandParser.compile(fn).params:
+                if not isinstance(annotation, str):
+                    continue
+                try:
+                    value, _ = formatter.get_field("0." + annotation, [self], {})
+                except (AttributeError, IndexError, KeyError):
+                    value = None
+                rv.extend(value if isinstance(value, list) else [value])
+        return rv
+
+    def stamp(self, ensemble):
+        """
+        Return a version stamp for the vocabulary of the mediator.
+
+        The default covers the active methods, the membership of the ensemble and the
+        `attributes` of the mediator which parameters are annotated with.
+        Override this method if your commands depend on other state.
+
+        """
+        return (frozenset(self.active), Members(ensemble), Members(self.attributes()))
+
+    def cache_info(self):
+        return self.CacheInfo(self.cache_hits, self.cache_misses, self.cache_size, len(self.cache))
+
+    @staticmethod
+    def rank(word, possibilities, n=1, cutoff=0.95):
+        """
+        Score each possibility for similarity to a word, keeping the best in a bounded heap.
+        Return a list of up to n (score, possibility) pairs, best first.
+
+        The results are those of `difflib.get_close_matches`, with their scores.
+
+        """
+        rv = []
+        matcher = difflib.SequenceMatcher()
+        matcher.set_seq2(word)
+        for x in possibilities:
+            matcher.set_seq1(x)
+            if matcher.real_quick_ratio() >= cutoff and matcher.quick_ratio() >= cutoff:
+                item = (matcher.ratio(), x)
+                if item[0] < cutoff:
+                    continue
+                elif len(rv) < n:
+                    heapq.heappush(rv, item)
+                elif item > rv[0]:
+                    heapq.heapreplace(rv, item)
+        return sorted(rv, reverse=True)
+
+    def resolve(self, text, ensemble=[], cutoff=0.95, n=1):
+        """
+        Return a list of (score, method, keyword arguments) for the n best matching command phrases.
+
+        The `budget` of the mediator limits the phrases each method may expand to, the phrases of
+        all methods together, and the time spent expanding them. A method over budget is not
+        expanded. Its terms are matched instead with each field filling a slot. Slot matches are
+        ranked as a phrase of the tokenized text, so they score 1 and share their place with any
+        phrase expanded from another method which matches exactly.
+
+        """
+        with telemetry.span("mediator.match"):
+            budget = self.budget
+            deadline = None if budget.seconds is None else time.perf_counter() + budget.seconds
+            options = defaultdict(list)
+            degraded = []
+            total = 0
+            for fn in sorted(self.active, key=lambda x: x.__name__):
+                if budget.phrases is not None or budget.total is not None:
+                    size = CommandParser.estimate(fn, ensemble, parent=self)
+                    if budget.phrases is not None and size > budget.phrases:
+                        CommandParser.over_budget(fn, "{0} phrases".format(size))
+                        degraded.append(fn)
+                        continue
+                    elif budget.total is not None and total + size > budget.total:
+                        CommandParser.over_budget(fn, "{0} phrases in total".format(total + size))
+                        degraded.append(fn)
+                        continue
+                    total += size
+
+                if deadline is not None and time.perf_counter() > deadline:
+                    CommandParser.over_budget(fn, "time")
+                    degraded.append(fn)
+                    continue
+
+                for k, v in CommandParser.expand_commands(fn, ensemble, parent=self, deadline=deadline):
+                    options[k].append(v)
+                if deadline is not None and time.perf_counter() > deadline:
+                    degraded.append(fn)
+
+            tokens = CommandParser.tokenizer.tokens(text)
+            phrase = " ".join(tokens)
+            for fn in degraded:
+                for kwargs in CommandParser.match_slots(fn, text, ensemble, parent=self):
+                    options[phrase].append((fn, kwargs))
+
+            ranked = (
+                self.rank(phrase, options, n=n, cutoff=cutoff)
+                or self.rank(" ".join(text.lower().split()), options, n=n, cutoff=cutoff)
+            )
+            telemetry.count("mediator.options", len(options))
+
+        return [(score, fn, kwargs) for score, phrase in ranked for fn, kwargs in options[phrase]]
+
+    def match(self, text, context=None, ensemble=[], cutoff=0.95, n=1):
+        """
+        Generate a 3-tuple of (method, positional arguments, keyword arguments) for each
+        active method which matches the text.
+
+        If n is greater than 1, generate a Candidate for each method of the n best matching
+        phrases, best first. A Candidate carries the similarity score as its fourth item.
+
+        When the mediator has a `cache_size`, results are kept in an LRU cache keyed by
+        the text (ignoring case and spacing) and the `stamp` of the mediator.
+        Each result has its own dictionary of keyword arguments.
+
+        """
+        if self.cache_size:
+            key = (self.stamp(ensemble), " ".join(text.lower().split()), cutoff, n)
+            try:
+                self.cache.move_to_end(key)
+            except KeyError:
+                self.cache_misses += 1
+                self.cache[key] = self.resolve(text, ensemble, cutoff, n)
+                while len(self.cache) > self.cache_size:
+                    self.cache.popitem(last=False)
+            else:
+                self.cache_hits += 1
+            found = self.cache[key]
+        else:
+            found = self.resolve(text, ensemble, cutoff, n)
+
+        if n > 1 and found:
+            yield from (self.Candidate(fn, [text, context], dict(kwargs), score) for score, fn, kwargs in found)
+        elif n > 1:
+            yield self.Candidate(None, [text, context], {}, 0)
+        elif found:
+            yield from ((fn, [text, context], dict(kwargs)) for score, fn, kwargs in found)
+        else:
             yield (None, [text, context], {})
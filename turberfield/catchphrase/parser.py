@@ -17,15 +17,58 @@
 # along with turberfield.  If not, see <http://www.gnu.org/licenses/>.
 
 
+import array
+from collections import namedtuple
 import enum
+import functools
 import inspect
 import itertools
+import math
+import re
 import string
+import sys
+import time
+import warnings
+
+from turberfield.catchphrase import telemetry
+
+
+class Tokenizer:
+    """
+    Splits text into lower case tokens, omitting those in a discard list unless the text
+    ends with the preserver character.
+
+    Tokens are not interned, since they may come from player input. Grammar terms are interned
+    when they are compiled.
+
+    A sequence of tokens may be stored as a compact array of integer ids. The vocabulary of ids
+    belongs to the caller, eg: one per grammar, so that it grows only with the words it is given.
+
+    """
+
+    def __init__(self, discard=(), preserver="."):
+        self.discard = frozenset(discard)
+        self.preserver = preserver
+
+    def tokens(self, text):
+        if text.endswith(self.preserver):
+            return text.rstrip(self.preserver).lower().split()
+        discard = self.discard
+        return [i for i in text.lower().split() if i not in discard]
+
+    @staticmethod
+    def ids(tokens, vocabulary):
+        """Return an array of the id of each token, assigning new ids in the vocabulary dictionary."""
+        return array.array("L", [vocabulary.setdefault(i, len(vocabulary)) for i in tokens])
 
 
 class CommandParser:
 
+    Budget = namedtuple("Budget", ["phrases", "total", "seconds"], defaults=[None, None, None])
+    Grammar = namedtuple("Grammar", ["terms", "params"])
+
     discard = ("a", "an", "any", "her", "his", "my", "some", "the", "their")
+    tokenizer = Tokenizer(discard)
 
     @staticmethod
     def unpack_annotation(name, annotation, ensemble, parent=None):
@@ -41,46 +84,220 @@ class CommandParser:
         for t in terms:
             if isinstance(t, type):
                 if issubclass(t, enum.Enum):
-                    yield from (
-                        (name, i) for i in t for v in (
-                            [i.value] if isinstance(i.value, str) else i.value
-                        )
-                    )
+                    yield from ((name, i) for i in CommandParser.expand_enum(t))
+                elif hasattr(ensemble, "of_type"):
+                    yield from ((name, i) for i in ensemble.of_type(t))
                 else:
                     yield from ((name, i) for i in ensemble if isinstance(i, t))
             else:
                 yield (name, t)
 
+    @staticmethod
+    @functools.lru_cache(maxsize=256)
+    def expand_enum(typ):
+        """Return a tuple of the members of an enum, each repeated once for every one of its values."""
+        return tuple(
+            i for i in typ for v in ([i.value] if isinstance(i.value, str) else i.value)
+        )
+
+    @staticmethod
+    def is_static(annotation):
+        """Return True if an annotation expands to the same values for any ensemble and parent."""
+        if isinstance(annotation, str):
+            return False
+        return all(
+            not isinstance(t, type) or issubclass(t, enum.Enum)
+            for t in (annotation if isinstance(annotation, list) else [annotation])
+        )
+
+    @staticmethod
+    def compile(method):
+        """
+        Return the Grammar of a method. This is the part of its expansion which depends only on its
+        definition; the tokenized terms of its docstring and the annotations of its parameters.
+
+        Each parameter is a pair of its name and annotation. Where the annotation does not depend on
+        the ensemble or parent, the annotation is replaced by a tuple of its expansion.
+
+        Grammars are cached by function, so bound methods of all instances of a class share one.
+
+        """
+        return CommandParser.compile_function(getattr(method, "__func__", method))
+
+    @staticmethod
+    @functools.lru_cache(maxsize=1024)
+    def compile_function(fn):
+        doc = fn.func.__doc__ if hasattr(fn, "func") else fn.__doc__
+        terms = tuple(
+            sys.intern(" ".join(CommandParser.tokenizer.tokens(term)))
+            for term in filter(None, (i.strip() for line in (doc or "").splitlines() for i in line.split("|")))
+        )
+        params = tuple(
+            (p.name, tuple(CommandParser.unpack_annotation(p.name, p.annotation, [])))
+            if CommandParser.is_static(p.annotation) else (p.name, p.annotation)
+            for p in inspect.signature(fn, follow_wrapped=True).parameters.values()
+            if p.annotation != inspect.Parameter.empty
+        )
+        return CommandParser.Grammar(terms, params)
+
+    @staticmethod
+    def phrase_table(method):
+        """
+        Return a tuple of (phrase, argument pairs) for a method whose parameters are all static,
+        or None if any depends on the ensemble or parent.
+
+        The table is built when the method is first expanded, and is cached by function.
+
+        """
+        return CommandParser.phrase_table_function(getattr(method, "__func__", method))
+
+    @staticmethod
+    @functools.lru_cache(maxsize=1024)
+    def phrase_table_function(fn):
+        terms, params = CommandParser.compile_function(fn)
+        if not all(isinstance(annotation, tuple) for name, annotation in params):
+            return None
+
+        rv = []
+        cartesian = list(itertools.product(*(annotation for name, annotation in params)))
+        for term in terms:
+            for pairs in cartesian:
+                try:
+                    rv.append((sys.intern(term.format(**dict(pairs)).lower()), pairs))
+                except (AttributeError, IndexError, KeyError, ValueError):
+                    continue
+        return tuple(rv)
+
+    @staticmethod
+    @functools.lru_cache(maxsize=16)
+    def build_tokenizer(discard=(), preserver="."):
+        return Tokenizer(discard, preserver)
+
     @staticmethod
     def parse_tokens(text, preserver=".", discard=None):
-        discard = discard or set()
-        return [
-            i.strip()
-            for i in text.rstrip(preserver).lower().split()
-            if i not in discard or text.endswith(preserver)
+        if discard is CommandParser.discard and preserver == ".":
+            tokenizer = CommandParser.tokenizer
+        else:
+            try:
+                tokenizer = CommandParser.build_tokenizer(discard or (), preserver)
+            except TypeError:
+                # Unhashable discard list
+                tokenizer = Tokenizer(discard, preserver)
+        return tokenizer.tokens(text)
+
+    @staticmethod
+    def slots(method, ensemble=[], parent=None):
+        """
+        Return the Grammar of a method, and a list of the (name, value) pairs
+        which may fill each of its parameters.
+
+        """
+        grammar = CommandParser.compile(method)
+        return grammar, [
+            annotation if isinstance(annotation, tuple)
+            else list(CommandParser.unpack_annotation(name, annotation, ensemble, parent))
+            for name, annotation in grammar.params
         ]
 
     @staticmethod
-    def expand_commands(method, ensemble=[], parent=None):
+    def estimate(method, ensemble=[], parent=None):
+        """Return the number of phrases a method would expand to."""
+        grammar, params = CommandParser.slots(method, ensemble, parent)
+        return len(grammar.terms) * math.prod(len(i) for i in params)
+
+    @staticmethod
+    def over_budget(method, reason):
+        warnings.warn("{0} is over budget: {1}".format(getattr(method, "__name__", method), reason), RuntimeWarning)
+        telemetry.count("parser.over_budget")
+
+    @staticmethod
+    @telemetry.timed("parser.expand_commands")
+    def expand_commands(method, ensemble=[], parent=None, deadline=None):
         """
         Read a method's docstring and expand it to create all possible matching
         command phrases. Calculate the corresponding keyword arguments.
 
         Generates pairs of each command with a 2-tuple; (method, keyword arguments).
 
+        If a deadline is given as a value of `time.perf_counter`, expansion stops once it has passed.
+        It limits only the time taken; use `estimate` to check the size of an expansion beforehand.
+
         """
-        doc = method.func.__doc__ if hasattr(method, "func") else method.__doc__
-        terms = list(filter(None, (i.strip() for line in doc.splitlines() for i in line.split("|"))))
-        params = list(itertools.chain(
-            list(CommandParser.unpack_annotation(p.name, p.annotation, ensemble, parent))
-            for p in inspect.signature(method, follow_wrapped=True).parameters.values()
-            if p.annotation != inspect.Parameter.empty
-        ))
+        table = CommandParser.phrase_table(method)
+        if table is not None:
+            yield from ((phrase, (method, dict(pairs))) for phrase, pairs in table)
+            telemetry.count("parser.phrases", len(table))
+            return
+
+        grammar, params = CommandParser.slots(method, ensemble, parent)
         cartesian = [dict(i) for i in itertools.product(*params)]
-        for term in terms:
-            tokens = CommandParser.parse_tokens(term, discard=CommandParser.discard)
-            for prod in cartesian:
+        n = 0
+        for term in grammar.terms:
+            for i, prod in enumerate(cartesian):
+                if deadline is not None and not i % 1024 and time.perf_counter() > deadline:
+                    CommandParser.over_budget(method, "time")
+                    telemetry.count("parser.phrases", n)
+                    return
                 try:
-                    yield (" ".join(tokens).format(**prod).lower(), (method, prod))
-                except (AttributeError, IndexError, KeyError) as e:
+                    yield (term.format(**prod).lower(), (method, prod))
+                    n += 1
+                except (AttributeError, IndexError, KeyError, ValueError):
+                    continue
+        telemetry.count("parser.phrases", n)
+
+    @staticmethod
+    @functools.lru_cache(maxsize=1024)
+    def compile_pattern(term):
+        """
+        Return a regular expression which matches a term with any text in place of its fields,
+        and a list of the fields, as (parameter name, format string) pairs.
+
+        """
+        pattern = []
+        fields = []
+        for literal, field, spec, conversion in string.Formatter().parse(term):
+            pattern.append(re.escape(literal))
+            if field is not None:
+                fmt = "{" + field + ("!" + conversion if conversion else "") + (":" + spec if spec else "") + "}"
+                fields.append((re.split(r"[.\[]", field, 1)[0], fmt))
+                pattern.append("(.+?)")
+        return re.compile("".join(pattern) + "$"), fields
+
+    @staticmethod
+    def match_slots(method, text, ensemble=[], parent=None):
+        """
+        Match text against the terms of a method without expanding them.
+        Each field in a term matches the formatted value of a parameter exactly.
+
+        Generates the keyword arguments of each match.
+
+        """
+        grammar, params = CommandParser.slots(method, ensemble, parent)
+        values = {name: [v for k, v in pairs] for (name, annotation), pairs in zip(grammar.params, params)}
+        candidates = dict.fromkeys([" ".join(CommandParser.tokenizer.tokens(text)), text.strip().lower()])
+        for term in grammar.terms:
+            try:
+                pattern, fields = CommandParser.compile_pattern(term)
+            except ValueError:
+                # Not a format string
+                continue
+            for candidate in candidates:
+                match = pattern.match(candidate)
+                if not match:
                     continue
+
+                options = dict(values)
+                for (name, fmt), group in zip(fields, match.groups()):
+                    found = []
+                    for value in options.get(name, []):
+                        try:
+                            if fmt.format(**{name: value}).lower() == group:
+                                found.append(value)
+                        except (AttributeError, IndexError, KeyError, ValueError):
+                            continue
+                    options[name] = found
+
+                rv = [dict(zip(options, prod)) for prod in itertools.product(*options.values())]
+                if rv:
+                    yield from rv
+                    return
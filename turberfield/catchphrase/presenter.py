@@ -25,9 +25,12 @@ import itertools
 import math
 import operator
 import pathlib
+import re
 import string
 
+from turberfield.catchphrase import telemetry
 from turberfield.catchphrase.mediator import Mediator
+from turberfield.dialogue.directives import Entity
 from turberfield.dialogue.model import Model
 from turberfield.dialogue.model import SceneScript
 from turberfield.dialogue.performer import Performer
@@ -51,7 +54,18 @@ class Presenter:
         with importlib.resources.path(pkg, resource) as path:
             return path.read_text(encoding="utf-8")
 
+    @staticmethod
+    @functools.lru_cache(maxsize=128)
+    def references(text):
+        """ Return the names of keyword fields in a dialogue template."""
+        return frozenset(
+            re.split(r"[.\[]", field, 1)[0]
+            for literal, field, spec, conversion in string.Formatter().parse(text)
+            if field and not field[0].isdigit() and field[0] not in ".["
+        )
+
     @classmethod
+    @telemetry.timed("presenter.build_presenter")
     def build_presenter(cls, folder, *args, facts=None, ensemble=None, strict=True, roles=1):
         rv = None
         paths = getattr(folder, "paths", folder)
@@ -67,10 +81,30 @@ class Presenter:
 
         return rv
 
+    @staticmethod
+    def casting_pool(script, ensemble):
+        """
+        Return the members of an ensemble which could be cast in a scene script.
+
+        Where every entity in the script declares its types, and the ensemble has a type index,
+        only instances of those types are returned. Otherwise the ensemble is returned unchanged.
+
+        """
+        if not hasattr(ensemble, "positions"):
+            return ensemble
+
+        types = []
+        for entity in group_by_type(script.doc)[Entity.Declaration]:
+            declared = tuple(filter(None, (entity.string_import(t) for t in entity["options"].get("types", []))))
+            if not declared:
+                return ensemble
+            types.extend(declared)
+        return [ensemble[n] for n in ensemble.positions(tuple(types))]
+
     @classmethod
     def build_from_text(cls, text, index=None, ensemble=[], strict=True, roles=1, path="inline"):
         script = SceneScript(path, doc=SceneScript.read(text))
-        selection = script.select(ensemble, roles=roles)
+        selection = script.select(cls.casting_pool(script, ensemble), roles=roles)
         if all(selection.values()) or (not strict and any(selection.values())):
             script.cast(selection)
             casting = {next(iter(i.attributes.get("names", [])), None): i.persona for i in selection}
@@ -162,6 +196,7 @@ class Presenter:
             if not frame[Model.Condition] or any([self.allows(i) for i in frame[Model.Condition]])
         ])
 
+    @telemetry.timed("presenter.animate")
     def animate(self, frame, dwell=0.3, pause=1, react=True):
         """ Return the next shot of dialogue as an animated frame."""
         if all([self.allows(i) for i in frame[Model.Condition]]):
@@ -14,15 +14,19 @@
 # along with turberfield.  If not, see <http://www.gnu.org/licenses/>.
 
 from collections import namedtuple
+from collections import OrderedDict
 import functools
+import gzip
+import hashlib
 import html
+import json
 import re
+import string
 import textwrap
 import urllib.parse
 
+from turberfield.catchphrase import telemetry
 from turberfield.catchphrase.mediator import Mediator
-from turberfield.catchphrase.presenter import Presenter
-from turberfield.dialogue.model import Model
 from turberfield.dialogue.types import DataObject
 
 """
@@ -45,6 +49,8 @@ class Settings(DataObject):
 
 class Renderer:
 
+    Form = namedtuple("Form", ["url", "head", "body"])
+
     @classmethod
     def param(cls, name, required, regex, values, tip):
         """ Experimental. Do not use. """
@@ -58,21 +64,25 @@ class Renderer:
 
     @classmethod
     def animated_audio_to_html(cls, anim, root="/", path="audio/", **kwargs):
+        element = anim.element
+        loop = 'loop="loop"' if element.loop and int(element.loop) > 1 else ""
         return f"""<div>
-<audio src="{root}{path}{anim.element.resource}" autoplay="autoplay"
-preload="auto" {'loop="loop"' if anim.element.loop and int(anim.element.loop) > 1 else ""}>
+<audio src="{root}{path}{element.resource}" autoplay="autoplay"
+preload="auto" {loop}>
 </audio>
 </div>"""
 
     @classmethod
     def animated_video_to_html(cls, anim, root="/", path="video/", autoplay=True, preload="metadata", **kwargs):
-        typ = "video/{0}".format(anim.element.resource.rsplit(".", 1)[-1])
+        element = anim.element
+        resource = element.resource
+        extension = resource.rsplit(".", 1)[-1]
+        typ = f"video/{extension}"
         autoplay = "autoplay " if autoplay else ""
-        url = anim.element.url
-        link = '<a href="{0}">Download {1}</a>'.format(url, typ.split("/")[-1].upper()) if url else ""
-        poster = f'poster="{anim.element.poster}"' if anim.element.poster else ""
-        resource = anim.element.resource
-        if urllib.parse.urlparse(anim.element.resource).scheme:
+        url = element.url
+        link = f'<a href="{url}">Download {extension.upper()}</a>' if url else ""
+        poster = f'poster="{element.poster}"' if element.poster else ""
+        if urllib.parse.urlparse(resource).scheme:
             root = ""
             path = ""
         elif url:
@@ -97,19 +107,17 @@ preload="auto" {'loop="loop"' if anim.element.loop and int(anim.element.loop) >
 
     @classmethod
     def animated_line_to_html(cls, anim, **kwargs):
-        name = anim.element.persona.name if hasattr(anim.element.persona, "name") else ""
-        name = "{0.firstname} {0.surname}".format(name) if hasattr(name, "firstname") else name
-        if getattr(anim.element.persona, "history", []):  # As per Mediator
-            tag = '<blockquote class="catchphrase-method-{0}">'.format(
-                anim.element.persona.history[0].name.lower()
-            )
-        else:
-            tag = "<blockquote>"
+        element = anim.element
+        persona = element.persona
+        name = getattr(persona, "name", "")
+        name = f"{name.firstname} {name.surname}" if hasattr(name, "firstname") else name
+        history = getattr(persona, "history", None)  # As per Mediator
+        tag = f'<blockquote class="catchphrase-method-{history[0].name.lower()}">' if history else "<blockquote>"
         return f"""
 <li style="animation-delay: {anim.delay:.2f}s; animation-duration: {anim.duration:.2f}s">
 {tag}
 <header>{name}</header>
-{anim.element.html}
+{element.html}
 </blockquote>
 </li>"""
 
@@ -123,16 +131,39 @@ preload="auto" {'loop="loop"' if anim.element.loop and int(anim.element.loop) >
 
     @classmethod
     def animated_still_to_html(cls, anim, **kwargs):
+        element = anim.element
         return f"""
 <div style="animation-duration: {anim.duration}s; animation-delay: {anim.delay}s">
-<img src="/img/{anim.element.resource}" alt="{anim.element.package} {anim.element.resource}" />
+<img src="/img/{element.resource}" alt="{element.package} {element.resource}" />
 </div>"""
 
+    @staticmethod
+    def freeze_action(action: Action):
+        """ Return a hashable copy of an Action without its reference."""
+        return action._replace(
+            ref=None,
+            parameters=tuple(p._replace(values=tuple(p.values or ())) for p in action.parameters or ())
+        )
+
+    @staticmethod
+    def compile_url(typ):
+        """ Split a URL template into pairs of quoted literal text and a field format."""
+        rv = []
+        n = 0
+        for literal, field, spec, conversion in string.Formatter().parse(typ):
+            if field is not None and (not field or field[0] in ".["):
+                field = "{0}{1}".format(n, field)
+                n += 1
+            fmt = None if field is None else "{{{0}{1}{2}}}".format(
+                field, "!" + conversion if conversion else "", ":" + spec if spec else ""
+            )
+            rv.append((urllib.parse.quote(literal), fmt))
+        return tuple(rv)
+
     @classmethod
-    def render_action_form(cls, action: Action, autofocus=False):
-        url = urllib.parse.quote(action.typ.format(*action.ref))
+    def generate_action_form(cls, action: Action, autofocus=False):
+        """ Generate the markup of an action form which follows the form tag."""
         if action.parameters:
-            yield f'<form role="form" action="{url}" method="{action.method}" name="{action.name}">'
             yield "<fieldset>"
 
         for p in action.parameters:
@@ -173,43 +204,117 @@ preload="auto" {'loop="loop"' if anim.element.loop and int(anim.element.loop) >
             yield "</form>"
 
     @classmethod
+    @functools.lru_cache(maxsize=256)
+    def compile_action_form(cls, action: Action):
+        """ Compile the static markup of a frozen action once.
+
+        Return a Form of the URL template, the form tag either side of the URL,
+        and the remaining markup without and with autofocus.
+
+        """
+        head = (
+            '<form role="form" action="', f'" method="{action.method}" name="{action.name}">'
+        ) if action.parameters else None
+        body = tuple(tuple(cls.generate_action_form(action, autofocus)) for autofocus in (False, True))
+        return cls.Form(cls.compile_url(action.typ), head, body)
+
+    @classmethod
+    @telemetry.timed("renderer.render_action_form")
+    def render_action_form(cls, action: Action, autofocus=False):
+        form = cls.compile_action_form(cls.freeze_action(action))
+        if form.head:
+            url = "".join(
+                literal + (urllib.parse.quote(fmt.format(*action.ref)) if fmt else "")
+                for literal, fmt in form.url
+            )
+            yield form.head[0] + url + form.head[1]
+
+        yield from form.body[bool(autofocus)]
+
+    @classmethod
+    @telemetry.timed("renderer.render_frame_to_terminal")
     def render_frame_to_terminal(cls, frame, ensemble=[], title="", backnav=""):
+        from turberfield.dialogue.model import Model
         for i in frame[Model.Line]:
             if i.element.text:
                 yield (cls.animated_line_to_terminal(i), i.duration)
 
     @staticmethod
     def render_dict_to_css(mapping=None, tag=":root"):
-        mapping = mapping or {}
-        entries = "\n".join("--{0}: {1};".format(k, v) for k, v in mapping.items())
+        items = tuple((mapping or {}).items())
+        try:
+            return Renderer.render_items_to_css(items, tag)
+        except TypeError:
+            # Unhashable values
+            return Renderer.render_items_to_css.__wrapped__(items, tag)
+
+    @staticmethod
+    @functools.lru_cache()
+    def render_items_to_css(items, tag=":root"):
+        entries = "\n".join("--{0}: {1};".format(k, v) for k, v in items)
         return "{tag} {{\n{entries}\n}}".format(tag=tag, entries=entries)
 
+    @staticmethod
+    def join_lines(seq, sep="\n"):
+        """ Generate the items of a sequence as if joined by a separator."""
+        for n, i in enumerate(seq):
+            yield sep + i if n else i
+
     @classmethod
-    def render_animated_frame_to_html(cls, frame, controls=[], **kwargs):
-        dialogue = "\n".join(cls.animated_line_to_html(i, **kwargs) for i in frame[Model.Line])
-        stills = "\n".join(cls.animated_still_to_html(i, **kwargs) for i in frame[Model.Still])
-        audio = "\n".join(cls.animated_audio_to_html(i, **kwargs) for i in frame[Model.Audio])
-        video = "\n".join(cls.animated_video_to_html(i, **kwargs) for i in frame[Model.Video])
+    def stream_animated_frame_to_html(cls, frame, controls=[], **kwargs):
+        """ Generate the HTML of an animated frame in document order.
+
+        The concatenated output is identical to that of `render_animated_frame_to_html`.
+
+        """
+        from turberfield.catchphrase.presenter import Presenter
+        from turberfield.dialogue.model import Model
+        yield "\n"
+        yield from cls.join_lines(cls.animated_audio_to_html(i, **kwargs) for i in frame[Model.Audio])
+        yield "\n"
+        yield from cls.join_lines(cls.animated_video_to_html(i, **kwargs) for i in frame[Model.Video])
+        yield '\n<aside class="catchphrase-reveal">\n'
+        yield from cls.join_lines(cls.animated_still_to_html(i, **kwargs) for i in frame[Model.Still])
+        yield '\n</aside>\n<main class="catchphrase-reveal">\n<ul>\n'
+        yield from cls.join_lines(cls.animated_line_to_html(i, **kwargs) for i in frame[Model.Line])
+        yield '\n</ul>\n</main>\n<nav class="catchphrase-reveal">\n<ul>\n'
         last = frame[Model.Line][-1] if frame[Model.Line] else Presenter.Animation(0, 0, None)
-        controls = "\n".join(
+        yield from cls.join_lines(
             cls.animate_controls(*controls, delay=last.delay + last.duration, dwell=0.3, **kwargs)
         )
-        return f"""
-{audio}
-{video}
-<aside class="catchphrase-reveal">
-{stills}
-</aside>
-<main class="catchphrase-reveal">
-<ul>
-{dialogue}
-</ul>
-</main>
-<nav class="catchphrase-reveal">
-<ul>
-{controls}
-</ul>
-</nav>"""
+        yield "\n</ul>\n</nav>"
+
+    @classmethod
+    def frame_regions(cls, frame, controls=[], **kwargs):
+        """ Return a dictionary of the HTML fragments in each region of an animated frame."""
+        from turberfield.catchphrase.presenter import Presenter
+        from turberfield.dialogue.model import Model
+        last = frame[Model.Line][-1] if frame[Model.Line] else Presenter.Animation(0, 0, None)
+        return {
+            "audio": tuple(cls.animated_audio_to_html(i, **kwargs) for i in frame[Model.Audio]),
+            "video": tuple(cls.animated_video_to_html(i, **kwargs) for i in frame[Model.Video]),
+            "stills": tuple(cls.animated_still_to_html(i, **kwargs) for i in frame[Model.Still]),
+            "lines": tuple(cls.animated_line_to_html(i, **kwargs) for i in frame[Model.Line]),
+            "controls": tuple(
+                cls.animate_controls(*controls, delay=last.delay + last.duration, dwell=0.3, **kwargs)
+            ),
+        }
+
+    @staticmethod
+    def render_regions_to_html(regions):
+        """ Return the HTML of an animated frame from its regions, as given by `frame_regions`."""
+        return "".join((
+            "\n", "\n".join(regions["audio"]), "\n", "\n".join(regions["video"]),
+            '\n<aside class="catchphrase-reveal">\n', "\n".join(regions["stills"]),
+            '\n</aside>\n<main class="catchphrase-reveal">\n<ul>\n', "\n".join(regions["lines"]),
+            '\n</ul>\n</main>\n<nav class="catchphrase-reveal">\n<ul>\n', "\n".join(regions["controls"]),
+            "\n</ul>\n</nav>",
+        ))
+
+    @classmethod
+    @telemetry.timed("renderer.render_animated_frame_to_html")
+    def render_animated_frame_to_html(cls, frame, controls=[], **kwargs):
+        return "".join(cls.stream_animated_frame_to_html(frame, controls, **kwargs))
 
     @staticmethod
     @functools.lru_cache()
@@ -237,3 +342,204 @@ preload="auto" {'loop="loop"' if anim.element.loop and int(anim.element.loop) >
 {{2}}
 </body>
 </html>"""
+
+    @staticmethod
+    @functools.lru_cache()
+    def split_body_html(title="", refresh=None, next_="", base_style="/css/base/catchphrase.css"):
+        """ Return the static segments of the page which surround its head, style and body."""
+        template = Renderer.render_body_html(title, refresh, next_, base_style)
+        return tuple(literal for literal, *_ in string.Formatter().parse(template))
+
+    @classmethod
+    @telemetry.timed("renderer.stream_body_html")
+    def stream_body_html(
+        cls, frame, controls=[], head="", style="", title="", refresh=None, next_="",
+        base_style="/css/base/catchphrase.css", encoding="utf-8", **kwargs
+    ):
+        """ Generate a complete page for an animated frame as a sequence of encoded chunks.
+
+        The first chunk contains the document head and the banner so it may be flushed immediately.
+        Dialogue lines follow one by one in document order.
+
+        """
+        segments = cls.split_body_html(title, refresh, next_, base_style)
+        yield "".join((segments[0], head, segments[1], style, segments[2])).encode(encoding)
+        for chunk in cls.stream_animated_frame_to_html(frame, controls, **kwargs):
+            yield chunk.encode(encoding)
+        yield segments[3].encode(encoding)
+
+
+class RenderCache:
+    """
+    A content-addressed cache of rendered frames with LRU eviction.
+
+    Entries are keyed by a digest of the scene text, the frame index, the personae who speak
+    and the delay and duration of each animated element. Each stores the encoded HTML, optionally precompressed,
+    and an ETag for HTTP responses.
+
+    """
+
+    Entry = namedtuple("Entry", ["etag", "data", "gzip"])
+    Info = namedtuple("Info", ["hits", "misses", "maxsize", "currsize"])
+
+    def __init__(self, maxsize=128, compress=False, encoding="utf-8", renderer=Renderer):
+        self.maxsize = maxsize
+        self.compress = compress
+        self.encoding = encoding
+        self.renderer = renderer
+        self.entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    @functools.lru_cache(maxsize=64)
+    def digest(text):
+        return hashlib.sha1(text.encode("utf-8")).hexdigest()
+
+    @staticmethod
+    def personae(frame):
+        """ Return the names of speakers in a frame, and the method which cued them if any."""
+        from turberfield.dialogue.model import Model
+        rv = []
+        for anim in frame[Model.Line]:
+            persona = anim.element.persona
+            history = getattr(persona, "history", None)
+            rv.append((str(getattr(persona, "name", "")), history[0].name if history else ""))
+        return tuple(rv)
+
+    @staticmethod
+    def timing(frame):
+        """ Return the delay and duration of each animated element in a frame."""
+        from turberfield.dialogue.model import Model
+        return tuple(
+            (getattr(anim, "delay", None), getattr(anim, "duration", None))
+            for typ in (Model.Audio, Model.Video, Model.Still, Model.Line)
+            for anim in frame.get(typ, [])
+        )
+
+    def key(self, presenter, index, controls=[], **kwargs):
+        frame = presenter.frames[index]
+        data = repr((
+            self.digest(presenter.text), index, self.personae(frame),
+            self.timing(frame), tuple(controls), sorted(kwargs.items())
+        ))
+        return hashlib.sha1(data.encode("utf-8")).hexdigest()
+
+    def info(self):
+        return self.Info(self.hits, self.misses, self.maxsize, len(self.entries))
+
+    def get(self, key):
+        try:
+            self.entries.move_to_end(key)
+        except KeyError:
+            self.misses += 1
+            return None
+        else:
+            self.hits += 1
+            return self.entries[key]
+
+    def put(self, key, text):
+        data = text.encode(self.encoding)
+        rv = self.Entry('"{0}"'.format(key), data, gzip.compress(data, mtime=0) if self.compress else None)
+        self.entries[key] = rv
+        self.entries.move_to_end(key)
+        while len(self.entries) > self.maxsize:
+            self.entries.popitem(last=False)
+        return rv
+
+    def render(self, presenter, index, controls=[], **kwargs):
+        """ Return a cache Entry for an animated frame of the presenter, rendering it if necessary."""
+        key = self.key(presenter, index, controls, **kwargs)
+        return self.get(key) or self.put(
+            key, self.renderer.render_animated_frame_to_html(presenter.frames[index], controls, **kwargs)
+        )
+
+
+class Delta:
+    """
+    Renders successive frames for one client as patches to the page it already has.
+
+    The first frame is rendered as a full page. After that, each frame is compared region by region
+    with the one before. Where the fragments of a region begin with all those previously sent,
+    only the new ones are appended. Otherwise the region is replaced. Unchanged regions are omitted.
+
+    Each Patch gives an operation, a CSS selector for the element whose content it changes,
+    and the HTML for it:
+
+    append
+        Insert the HTML at the end of the element.
+    replace
+        Replace the content of the element with the HTML.
+
+    Audio and video elements have no container on the page, so a frame whose media
+    differ from the last needs a full page. So does a change to the head, title, refresh,
+    next page or base style of the page.
+
+    """
+
+    Patch = namedtuple("Patch", ["op", "selector", "html"])
+
+    selectors = {
+        "style": "body > style",
+        "stills": "aside.catchphrase-reveal",
+        "lines": "main.catchphrase-reveal > ul",
+        "controls": "nav.catchphrase-reveal > ul",
+    }
+
+    def __init__(self, renderer=Renderer):
+        self.renderer = renderer
+        self.regions = None
+
+    def state(
+        self, frame, controls=[], head="", style="", title="", refresh=None, next_="",
+        base_style="/css/base/catchphrase.css", **kwargs
+    ):
+        """ Return the regions of a page for a frame, with its style and page-level parameters."""
+        return dict(
+            self.renderer.frame_regions(frame, controls, **kwargs),
+            style=(style,), page=(head, title, refresh, next_, base_style)
+        )
+
+    def page(self, frame, controls=[], **kwargs):
+        """ Return a complete page for a frame, and keep its regions for the next patch."""
+        self.regions = self.state(frame, controls, **kwargs)
+        head, title, refresh, next_, base_style = self.regions["page"]
+        return self.renderer.render_body_html(title, refresh, next_, base_style).format(
+            head, self.regions["style"][0], self.renderer.render_regions_to_html(self.regions)
+        )
+
+    def patch(self, frame, controls=[], **kwargs):
+        """ Return a list of Patches from the previous frame to this one, or None if a full page is needed."""
+        if self.regions is None:
+            return None
+
+        with telemetry.span("renderer.patch"):
+            regions = self.state(frame, controls, **kwargs)
+            if any(regions[i] != self.regions[i] for i in ("page", "audio", "video")):
+                return None
+
+            rv = []
+            for name, selector in self.selectors.items():
+                old, new = self.regions[name], regions[name]
+                if new == old:
+                    continue
+                elif old and new[:len(old)] == old:
+                    rv.append(self.Patch("append", selector, "".join("\n" + i for i in new[len(old):])))
+                else:
+                    rv.append(self.Patch("replace", selector, "\n".join(new)))
+            self.regions = regions
+            return rv
+
+    def render(self, frame, controls=[], **kwargs):
+        """
+        Return a media type and text for a frame: a full page of HTML if necessary,
+        otherwise a JSON list of patches.
+
+        Keyword arguments are those of `Renderer.stream_body_html`, except for the encoding.
+
+        """
+        patches = self.patch(frame, controls, **kwargs)
+        if patches is None:
+            return "text/html", self.page(frame, controls, **kwargs)
+        return "application/json", json.dumps([i._asdict() for i in patches], separators=(",", ":"))
+
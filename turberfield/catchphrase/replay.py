@@ -0,0 +1,193 @@
+#!/usr/bin/env python3
+# encoding: UTF-8
+
+# This file is part of turberfield.
+#
+# Turberfield is free software: you can redistribute it and/or modify it
+# under the terms of the GNU General Public License as published
+# by the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# Turberfield is distributed in the hope that it will be useful, but
+# WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with turberfield.  If not, see <http://www.gnu.org/licenses/>.
+
+import argparse
+from collections import defaultdict
+from collections import namedtuple
+import json
+import statistics
+import sys
+import time
+
+from turberfield.catchphrase.parser import CommandParser
+from turberfield.catchphrase.render import Renderer
+from turberfield.catchphrase import telemetry
+from turberfield.catchphrase.vocabulary import load
+from turberfield.catchphrase import worker
+
+__doc__ = """
+Capture the commands of game sessions and replay them to measure a story under load.
+
+A server captures sessions from the history of their Mediators, and saves them as JSON lines::
+
+    with open("sessions.jsonl", "a") as output:
+        replay.dump([replay.capture(mediator, ensemble)], output)
+
+Words which are not in the vocabulary of the mediator are masked, so that nothing
+a player typed in free text is kept. Articles and other words which the parser discards are kept.
+
+The replay needs a session factory, as for `terminal.session`. It is called once per session,
+and must return a callable which accepts a line of input and returns a sequence of animated frames::
+
+    catchphrase-replay mypackage.story:session sessions.jsonl --concurrency 4
+
+Frames are rendered to HTML. The report gives the throughput of commands, and the latency of
+each stage of the pipeline from its telemetry spans.
+With a concurrency greater than 1, sessions are shared among forked worker processes.
+
+"""
+
+Result = namedtuple("Result", ["commands", "seconds", "spans"])
+
+
+def words(mediator, ensemble=[]):
+    """
+    Return the set of words in the vocabulary of a mediator.
+    Words discarded by the parser are included, so that commands which use them still match.
+
+    """
+    return {
+        word
+        for fn in mediator.active
+        for phrase, _ in CommandParser.expand_commands(fn, ensemble, parent=mediator)
+        for word in phrase.split()
+    }.union(CommandParser.discard)
+
+
+def anonymize(text, vocabulary, mask="_"):
+    """Replace each word of a command which is not in the vocabulary."""
+    return " ".join(i if i in vocabulary else mask for i in text.lower().split())
+
+
+def capture(mediator, ensemble=[], anonymous=True):
+    """
+    Return the commands in the history of a mediator, oldest first.
+    Commands which matched no method are not recorded in the history.
+
+    """
+    vocabulary = words(mediator, ensemble) if anonymous else None
+    return [
+        anonymize(text, vocabulary) if anonymous else text
+        for record in reversed(mediator.history)
+        for text in record.args[:1]
+        if isinstance(text, str)
+    ]
+
+
+def dump(sessions, stream):
+    for commands in sessions:
+        stream.write(json.dumps(commands))
+        stream.write("\n")
+
+
+def read(stream):
+    """Return a list of sessions from a stream of JSON lines. Each session is a list of commands."""
+    return [json.loads(line) for line in stream if line.strip()]
+
+
+def play(n, factory, sessions, concurrency=1, renderer=Renderer):
+    """Run every session whose position modulo the concurrency is n. Return a Result."""
+    collector = telemetry.register(telemetry.Collector())
+    commands = 0
+    start = time.perf_counter()
+    try:
+        for session in sessions[n::concurrency]:
+            turn = factory()
+            for command in session:
+                with telemetry.span("replay.turn"):
+                    for frame in turn(command) or []:
+                        if frame:
+                            renderer.render_animated_frame_to_html(frame)
+                commands += 1
+    finally:
+        telemetry.unregister(collector)
+    return Result(commands, time.perf_counter() - start, dict(collector.spans))
+
+
+def replay(factory, sessions, concurrency=1):
+    """Replay sessions, in this process or in forked workers. Return a list of Results."""
+    if concurrency == 1:
+        return [play(0, factory, sessions)]
+    return [i[1] for i in worker.fork(play, factory, sessions, concurrency, workers=concurrency)]
+
+
+def report(results):
+    """Return a dictionary of throughput, and of latency in ms for each stage."""
+    spans = defaultdict(list)
+    for result in results:
+        for name, durations in result.spans.items():
+            spans[name].extend(durations)
+
+    commands = sum(i.commands for i in results)
+    seconds = max((i.seconds for i in results), default=0)
+    rv = {
+        "commands": commands,
+        "seconds": seconds,
+        "commands_per_s": commands / seconds if seconds else 0,
+        "stages": {},
+    }
+    for name, durations in sorted(spans.items()):
+        values = [1000 * i for i in durations]
+        cuts = statistics.quantiles(values, n=100, method="inclusive") if len(values) > 1 else values * 99
+        rv["stages"][name] = {
+            "count": len(values), "mean": statistics.mean(values),
+            "p50": cuts[49], "p90": cuts[89], "p99": cuts[98], "max": max(values),
+        }
+    return rv
+
+
+def main(args):
+    factory = load(args.factory)
+    with open(args.sessions, "r") as stream:
+        sessions = read(stream) * args.repeat
+
+    rv = report(replay(factory, sessions, concurrency=args.concurrency))
+    if args.json:
+        print(json.dumps(rv, indent=4), file=sys.stdout)
+        return 0
+
+    print("{0[commands]} commands in {0[seconds]:.2f}s: {0[commands_per_s]:.1f}/s".format(rv), file=sys.stdout)
+    print("{0:<48} {1:>8} {2:>10} {3:>10} {4:>10} {5:>10}".format(
+        "stage (ms)", "count", "mean", "p50", "p90", "p99"), file=sys.stdout
+    )
+    for name, stage in rv["stages"].items():
+        print("{0:<48} {1[count]:>8} {1[mean]:>10.3f} {1[p50]:>10.3f} {1[p90]:>10.3f} {1[p99]:>10.3f}".format(
+            name, stage), file=sys.stdout
+        )
+    return 0
+
+
+def parser():
+    rv = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    rv.add_argument("factory", help="Import path of a session factory, eg: 'mypackage.story:session'.")
+    rv.add_argument("sessions", help="Path to a file of captured sessions.")
+    rv.add_argument("--concurrency", type=int, default=1, help="Number of worker processes [%(default)s].")
+    rv.add_argument("--repeat", type=int, default=1, help="Number of times to replay each session [%(default)s].")
+    rv.add_argument("--json", action="store_true", default=False, help="Print the report as JSON.")
+    return rv
+
+
+def run():
+    p = parser()
+    args = p.parse_args()
+    rv = main(args)
+    sys.exit(rv)
+
+
+if __name__ == "__main__":
+    run()
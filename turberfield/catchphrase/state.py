@@ -0,0 +1,246 @@
+#!/usr/bin/env python3
+# encoding: UTF-8
+
+# This file is part of turberfield.
+#
+# Turberfield is free software: you can redistribute it and/or modify it
+# under the terms of the GNU General Public License as published
+# by the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# Turberfield is distributed in the hope that it will be useful, but
+# WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with turberfield.  If not, see <http://www.gnu.org/licenses/>.
+
+from collections import defaultdict
+from collections import namedtuple
+from collections.abc import Mapping
+import heapq
+
+from turberfield.dialogue.types import Stateful
+
+__doc__ = """
+Stateful objects which know how long they have been in each state.
+
+For every type of state, an `Impulsive` object keeps a `Tally` of the current value,
+the number of times in a row it has been set (dwell), and the clock tick at which it was entered.
+
+A `Net` is a timed coloured Petri net over those states. Each entity is a token, and its states
+are the places it occupies. Transitions are declared on a state enum by the names of its members::
+
+    class Crossing(enum.Enum):
+        waiting = enum.auto()
+        walking = enum.auto()
+        arrived = enum.auto()
+
+        __transitions__ = [("waiting", "walking", 3), ("walking", "arrived", 10)]
+
+Each declaration is a source, a target, a delay in ticks and an optional guard function
+which is passed the entity.
+A transition is enabled when an entity has been in the source state for at least the delay.
+
+"""
+
+
+class Tally:
+
+    __slots__ = ("state", "dwell", "entered")
+
+    def __init__(self, state, dwell=1, entered=0):
+        self.state = state
+        self.dwell = dwell
+        self.entered = entered
+
+    def __repr__(self):
+        return "Tally(state={0.state!r}, dwell={0.dwell}, entered={0.entered})".format(self)
+
+
+class Tallies(Mapping):
+    """A read-only view of the dwell count for each type of state, keyed by type or type name."""
+
+    __slots__ = ("states",)
+
+    def __init__(self, states):
+        self.states = states
+
+    def __getitem__(self, key):
+        return self.states[getattr(key, "__name__", key)].dwell
+
+    def __iter__(self):
+        return iter(self.states)
+
+    def __len__(self):
+        return len(self.states)
+
+
+class Impulsive(Stateful):
+    """
+    A Stateful mixin which tallies its states.
+
+    The `clock` attribute gives the current tick. Advance it on the class to age every object
+    together, or on an instance to age it alone.
+
+    """
+
+    clock = 0
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._states = {}
+
+    @property
+    def tally(self):
+        return Tallies(self._states)
+
+    def set_state(self, *args):
+        for value in args:
+            key = type(value).__name__
+            tally = self._states.get(key)
+            if tally is None:
+                self._states[key] = Tally(value, 1, self.clock)
+            elif tally.state == value:
+                tally.dwell += 1
+            else:
+                tally.state = value
+                tally.dwell = 1
+                tally.entered = self.clock
+        return self
+
+    def get_state(self, typ=int, default=0):
+        try:
+            return self._states[typ.__name__].state
+        except KeyError:
+            return default
+
+    def get_tally(self, typ=int):
+        """Return the Tally for a type of state, or None."""
+        return self._states.get(typ.__name__)
+
+    def age(self, typ=int, default=0):
+        """Return the number of ticks since the current state of a type was entered."""
+        try:
+            return self.clock - self._states[typ.__name__].entered
+        except KeyError:
+            return default
+
+
+class Net:
+    """
+    Fires the transitions of state enums in batches, once per tick of a shared clock.
+
+    Every tick has two phases. First the enabled transitions of all entities are found.
+    Then they all fire, so no entity sees the effect of another in the same tick.
+    Where several transitions leave the same state, the first declared which is enabled wins.
+
+    `step` examines every entity it is given. For large ensembles, `add` entities once and call `tick`.
+    Entities are then filed by the tick at which they next become due, and only those are examined.
+    Each tick examines every entity which has fallen due since the last, so the clock may also be
+    advanced by other means. Call `add` again after changing the state of an entity outside the net.
+
+    The net advances the `clock` attribute of its timer, which is the `Impulsive` class by default.
+
+    """
+
+    Transition = namedtuple("Transition", ["source", "target", "delay", "guard"], defaults=[0, None])
+    Firing = namedtuple("Firing", ["entity", "transition"])
+
+    @staticmethod
+    def transitions(typ):
+        """Generate the Transitions declared on a state enum."""
+        for source, target, *args in getattr(typ, "__transitions__", []):
+            yield Net.Transition(
+                typ[source] if isinstance(source, str) else source,
+                typ[target] if isinstance(target, str) else target,
+                *args
+            )
+
+    def __init__(self, *types, timer=Impulsive):
+        self.types = types
+        self.timer = timer
+        self.table = defaultdict(list)
+        for typ in types:
+            for transition in self.transitions(typ):
+                self.table[transition.source].append(transition)
+        self.table = {k: tuple(v) for k, v in self.table.items()}
+        self.delays = {k: min(t.delay for t in v) for k, v in self.table.items()}
+        self.calendar = defaultdict(list)
+        self.due = []
+
+    @property
+    def clock(self):
+        return self.timer.clock
+
+    def enabled(self, entity, typ):
+        """Return the transition of a type which the entity would fire now, or None."""
+        tally = entity.get_tally(typ)
+        if tally is None:
+            return None
+        age = self.timer.clock - tally.entered
+        for transition in self.table.get(tally.state, ()):
+            if age >= transition.delay and (transition.guard is None or transition.guard(entity)):
+                return transition
+        return None
+
+    def fire(self, firings):
+        for entity, transition in firings:
+            entity.set_state(transition.target)
+        self.timer.clock += 1
+        return firings
+
+    def step(self, entities):
+        """Fire every enabled transition of the entities and advance the clock. Return the Firings."""
+        return self.fire([
+            self.Firing(entity, transition)
+            for entity in entities
+            for typ in self.types
+            for transition in (self.enabled(entity, typ),)
+            if transition is not None
+        ])
+
+    def schedule(self, entity, typ, earliest=None):
+        tally = entity.get_tally(typ)
+        if tally is None or tally.state not in self.table:
+            return None
+        due = tally.entered + self.delays[tally.state]
+        due = max(due, self.timer.clock if earliest is None else earliest)
+        if due not in self.calendar:
+            heapq.heappush(self.due, due)
+        self.calendar[due].append((entity, typ, tally.state, tally.entered))
+        return due
+
+    def add(self, *entities):
+        """File entities under the tick at which each of their states may next change."""
+        for entity in entities:
+            for typ in self.types:
+                self.schedule(entity, typ)
+        return self
+
+    def tick(self):
+        """Fire the transitions of entities which are due and advance the clock. Return the Firings."""
+        clock = self.timer.clock
+        seen = set()
+        firings = []
+        entries = []
+        while self.due and self.due[0] <= clock:
+            entries.extend(self.calendar.pop(heapq.heappop(self.due)))
+
+        for entity, typ, state, entered in entries:
+            tally = entity.get_tally(typ)
+            if tally is None or tally.state != state or tally.entered != entered or (id(entity), typ) in seen:
+                continue
+            seen.add((id(entity), typ))
+
+            transition = self.enabled(entity, typ)
+            if transition is None:
+                self.schedule(entity, typ, earliest=clock + 1)
+            else:
+                firings.append(self.Firing(entity, transition))
+
+        self.fire(firings)
+        for entity, transition in firings:
+            self.schedule(entity, type(transition.target))
+        return firings
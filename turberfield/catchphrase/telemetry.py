@@ -0,0 +1,172 @@
+#!/usr/bin/env python3
+# encoding: UTF-8
+
+# This file is part of turberfield.
+#
+# Turberfield is free software: you can redistribute it and/or modify it
+# under the terms of the GNU General Public License as published
+# by the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# Turberfield is distributed in the hope that it will be useful, but
+# WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with turberfield.  If not, see <http://www.gnu.org/licenses/>.
+
+from collections import Counter
+from collections import defaultdict
+import contextlib
+import functools
+import inspect
+import logging
+import time
+
+__doc__ = """
+Timing spans and counters emitted by the parser, mediator, presenter and renderer.
+
+Nothing is measured until a sink is registered. A sink is any object with these methods:
+
+* span(name, start, duration)
+* count(name, n)
+
+"""
+
+sinks = []
+
+disabled = contextlib.nullcontext()
+
+
+class Span:
+
+    __slots__ = ("name", "start")
+
+    def __init__(self, name):
+        self.name = name
+        self.start = None
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        duration = time.perf_counter() - self.start
+        for sink in sinks:
+            sink.span(self.name, self.start, duration)
+        return False
+
+
+def span(name):
+    """Return a context manager which times its block. Does nothing if no sink is registered."""
+    return Span(name) if sinks else disabled
+
+
+def iterate(name, iterable):
+    """
+    Generate the items of an iterable, timing only the work done to produce them.
+    Time spent by the consumer between items is not counted.
+    The span is emitted when the iterable is exhausted or the generator is closed.
+
+    """
+    start = time.perf_counter()
+    duration = 0
+    items = iter(iterable)
+    try:
+        while True:
+            t = time.perf_counter()
+            try:
+                item = next(items)
+            except StopIteration:
+                return
+            finally:
+                duration += time.perf_counter() - t
+            yield item
+    finally:
+        getattr(items, "close", lambda: None)()
+        for sink in sinks:
+            sink.span(name, start, duration)
+
+
+def timed(name):
+    """
+    Decorate a function so that each call is timed as a span.
+    For a generator function, only the time taken to produce its items is counted.
+
+    """
+    def decorator(fn):
+        if inspect.isgeneratorfunction(fn):
+            @functools.wraps(fn)
+            def generator(*args, **kwargs):
+                rv = fn(*args, **kwargs)
+                return iterate(name, rv) if sinks else rv
+            return generator
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            if not sinks:
+                return fn(*args, **kwargs)
+            with Span(name):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def count(name, n=1):
+    for sink in sinks:
+        sink.count(name, n)
+
+
+def register(sink):
+    sinks.append(sink)
+    return sink
+
+
+def unregister(sink):
+    try:
+        sinks.remove(sink)
+    except ValueError:
+        pass
+    return sink
+
+
+class Collector:
+    """Keeps spans and counters in memory."""
+
+    def __init__(self):
+        self.spans = defaultdict(list)
+        self.counters = Counter()
+
+    def span(self, name, start, duration):
+        self.spans[name].append(duration)
+
+    def count(self, name, n):
+        self.counters[name] += n
+
+
+class Callback:
+    """Passes every measurement to a function as (kind, name, value)."""
+
+    def __init__(self, fn):
+        self.fn = fn
+
+    def span(self, name, start, duration):
+        self.fn("span", name, duration)
+
+    def count(self, name, n):
+        self.fn("count", name, n)
+
+
+class LoggingSink:
+    """Writes measurements to a logger."""
+
+    def __init__(self, name="turberfield.catchphrase.telemetry", level=logging.DEBUG):
+        self.log = logging.getLogger(name)
+        self.level = level
+
+    def span(self, name, start, duration):
+        self.log.log(self.level, "%s %.6fs", name, duration)
+
+    def count(self, name, n):
+        self.log.log(self.level, "%s %+d", name, n)
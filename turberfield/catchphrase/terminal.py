@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+# encoding: UTF-8
+
+# This file is part of turberfield.
+#
+# Turberfield is free software: you can redistribute it and/or modify it
+# under the terms of the GNU General Public License as published
+# by the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# Turberfield is distributed in the hope that it will be useful, but
+# WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with turberfield.  If not, see <http://www.gnu.org/licenses/>.
+
+import asyncio
+import functools
+
+from turberfield.catchphrase.render import Renderer
+
+
+class Terminal:
+    """
+    Writes animated frames as plain text to an asyncio stream.
+
+    Each line is written at the moment given by its animation delay, measured from the
+    start of the frame. Waiting is done by the event loop, so one thread may serve
+    many terminals at once.
+
+    """
+
+    def __init__(self, writer, renderer=Renderer, speed=1.0, encoding="utf-8"):
+        self.writer = writer
+        self.renderer = renderer
+        self.speed = speed
+        self.encoding = encoding
+
+    async def write_frame(self, frame):
+        from turberfield.dialogue.model import Model
+        loop = asyncio.get_running_loop()
+        start = loop.time()
+        end = start
+        for anim in sorted(frame[Model.Line], key=lambda x: x.delay):
+            end = max(end, start + (anim.delay + anim.duration) / self.speed)
+            if not anim.element.text:
+                continue
+
+            await asyncio.sleep(max(0, start + anim.delay / self.speed - loop.time()))
+            text = self.renderer.animated_line_to_terminal(anim)
+            self.writer.write("{0}\n".format(text).encode(self.encoding))
+            await self.writer.drain()
+
+        await asyncio.sleep(max(0, end - loop.time()))
+        return frame
+
+
+async def session(reader, writer, factory, prompt="> ", **kwargs):
+    """
+    Run a text session over a pair of asyncio streams.
+
+    The factory is called once per session. It must return a callable which accepts a line
+    of input and returns a sequence of animated frames.
+
+    """
+    turn = factory()
+    terminal = Terminal(writer, **kwargs)
+    try:
+        while True:
+            writer.write(prompt.encode(terminal.encoding))
+            await writer.drain()
+            data = await reader.readline()
+            if not data:
+                break
+
+            for frame in turn(data.decode(terminal.encoding).strip()) or []:
+                if frame:
+                    await terminal.write_frame(frame)
+    finally:
+        writer.close()
+        await writer.wait_closed()
+
+
+async def serve(factory, host="127.0.0.1", port=0, path=None, **kwargs):
+    """
+    Start a server which runs a session for every connection.
+
+    Supply `path` to listen on a local socket rather than a TCP port.
+
+    """
+    handler = functools.partial(session, factory=factory, **kwargs)
+    if path is not None:
+        return await asyncio.start_unix_server(handler, path)
+    else:
+        return await asyncio.start_server(handler, host, port)
@@ -0,0 +1,64 @@
+#!/usr/bin/env python3
+# encoding: UTF-8
+
+# This file is part of turberfield.
+#
+# Turberfield is free software: you can redistribute it and/or modify it
+# under the terms of the GNU General Public License as published
+# by the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# Turberfield is distributed in the hope that it will be useful, but
+# WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with turberfield.  If not, see <http://www.gnu.org/licenses/>.
+
+import unittest
+
+from turberfield.catchphrase.benchmark import bench_turn
+from turberfield.catchphrase.benchmark import compare
+from turberfield.catchphrase.benchmark import import_time
+from turberfield.catchphrase.benchmark import stages
+from turberfield.catchphrase.benchmark import synthetic_story
+
+
+class SyntheticStoryTests(unittest.TestCase):
+
+    def test_commands_match(self):
+        mediator, ensemble, commands, text = synthetic_story(ensemble=4, methods=3, alternatives=2)
+        for cmd in commands:
+            with self.subTest(cmd=cmd):
+                fn, args, kwargs = mediator.interpret(mediator.match(cmd, ensemble=ensemble))
+                self.assertTrue(fn)
+                self.assertIn(kwargs["obj"].names[0], cmd)
+
+
+class TurnBenchmarkTests(unittest.TestCase):
+
+    def test_stages(self):
+        rv = bench_turn(number=4, ensemble=2, methods=2, alternatives=2, lines=2)
+        self.assertEqual(list(stages), list(rv))
+        self.assertTrue(all(rv[i]["p50"] > 0 for i in stages), rv)
+
+    def test_single_sample(self):
+        rv = bench_turn(number=1, repeat=2, ensemble=2, methods=2, alternatives=2, lines=2)
+        self.assertTrue(all(rv[i]["p50"] == rv[i]["p99"] == rv[i]["max"] for i in stages), rv)
+
+    def test_compare(self):
+        rv = list(compare({"a": {"b": 2.0, "c": 0}}, {"a": {"b": 3.0, "c": 1}, "meta": {"version": "0"}}))
+        self.assertEqual([("a.b", 2.0, 3.0, 1.5)], rv)
+
+
+class ImportTests(unittest.TestCase):
+
+    def test_lazy_imports(self):
+        for name in ("parser", "mediator", "state", "ensemble", "codec", "render", "worker"):
+            with self.subTest(name=name):
+                us, names = import_time("turberfield.catchphrase." + name)
+                self.assertIn("turberfield.catchphrase." + name, names)
+                self.assertGreater(us, 0)
+                self.assertNotIn("docutils", names)
+                self.assertNotIn("turberfield.dialogue.model", names)
@@ -0,0 +1,70 @@
+#!/usr/bin/env python3
+# encoding: UTF-8
+
+# This file is part of turberfield.
+#
+# Turberfield is free software: you can redistribute it and/or modify it
+# under the terms of the GNU General Public License as published
+# by the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# Turberfield is distributed in the hope that it will be useful, but
+# WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with turberfield.  If not, see <http://www.gnu.org/licenses/>.
+
+import gzip
+import pathlib
+import tempfile
+import textwrap
+import unittest
+
+from turberfield.catchphrase.css.bundle import build
+from turberfield.catchphrase.css.bundle import minify
+from turberfield.catchphrase.render import Renderer
+
+
+class BundleTests(unittest.TestCase):
+
+    def test_minify(self):
+        text = textwrap.dedent("""
+        /* Comment */
+        @media screen and (max-width: 1024px) {
+
+        nav.catchphrase-reveal ul {
+        display: none;
+        border-left: 1rem solid var(--catchphrase-colour-washout, whitesmoke);
+        }
+
+        }
+        """)
+        self.assertEqual(
+            "@media screen and (max-width:1024px){nav.catchphrase-reveal ul{display:none;"
+            "border-left:1rem solid var(--catchphrase-colour-washout,whitesmoke)}}",
+            minify(text)
+        )
+
+    def test_build(self):
+        with tempfile.TemporaryDirectory() as output:
+            rv = build(output)
+            hashed = rv["catchphrase.css"]
+            self.assertRegex(hashed, r"catchphrase\.[0-9a-f]{12}\.css")
+            data = pathlib.Path(output, hashed).read_bytes()
+            self.assertEqual(data, gzip.decompress(pathlib.Path(output, hashed + ".gz").read_bytes()))
+            self.assertEqual(rv, build(output))
+
+
+class ThemeTests(unittest.TestCase):
+
+    def test_render_dict_cached(self):
+        mapping = {"catchphrase-colour-washout": "hsl(50, 0%, 100%)"}
+        rv = Renderer.render_dict_to_css(mapping)
+        self.assertIs(rv, Renderer.render_dict_to_css(dict(mapping)))
+        self.assertIn("--catchphrase-colour-washout: hsl(50, 0%, 100%);", rv)
+
+    def test_render_dict_unhashable(self):
+        rv = Renderer.render_dict_to_css({"catchphrase-reveal-extends": ["both"]})
+        self.assertIn("--catchphrase-reveal-extends: ['both'];", rv)
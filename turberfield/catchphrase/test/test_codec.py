@@ -0,0 +1,94 @@
+#!/usr/bin/env python3
+# encoding: UTF-8
+
+# This file is part of turberfield.
+#
+# Turberfield is free software: you can redistribute it and/or modify it
+# under the terms of the GNU General Public License as published
+# by the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# Turberfield is distributed in the hope that it will be useful, but
+# WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with turberfield.  If not, see <http://www.gnu.org/licenses/>.
+
+import json
+import textwrap
+import unittest
+
+from turberfield.catchphrase.codec import Codec
+from turberfield.catchphrase.presenter import Presenter
+
+
+class CodecTests(unittest.TestCase):
+
+    def setUp(self):
+        text = textwrap.dedent("""
+        .. entity:: CROW
+
+        Scene
+        =====
+
+        Shot
+        ----
+
+        .. fx:: pot.mp3  crow_call-3s.mp3
+           :offset: 0
+           :duration: 3000
+           :loop: 1
+
+        [CROW]_
+
+            Caw, caw.
+
+        Ça va?
+
+        """)
+        self.crow = type("Crow", (), {"name": "Crow"})()
+        presenter = Presenter.build_from_text(text, ensemble=[self.crow])
+        self.frame = presenter.animate(presenter.frames[0])
+
+    def test_dict(self):
+        rv = Codec.frame_to_dict(self.frame)
+        self.assertEqual("shot", rv["name"])
+        self.assertEqual(2, len(rv["lines"]))
+        self.assertEqual([0, 1300, "Crow", "Caw, caw."], rv["lines"][0][:4])
+        self.assertEqual("", rv["lines"][1][2])
+        self.assertEqual([0, 3000, "pot.mp3", "crow_call-3s.mp3", "1"], rv["audio"][0])
+        self.assertEqual([], rv["video"])
+
+    def test_json(self):
+        rv = list(Codec.stream_json([self.frame, self.frame]))
+        self.assertEqual(2, len(rv))
+        self.assertTrue(rv[0].endswith(b"\n"))
+        self.assertEqual(Codec.frame_to_dict(self.frame), json.loads(rv[0]))
+
+    def test_binary(self):
+        data = Codec.encode_binary(self.frame)
+        self.assertTrue(data.startswith(b"CPF\x01"))
+        self.assertEqual(Codec.frame_to_dict(self.frame), Codec.decode_binary(data))
+        self.assertLess(len(data), len(Codec.encode_json(self.frame).encode("utf-8")))
+
+        with self.assertRaises(ValueError):
+            Codec.decode_binary(b"CPF\x00")
+
+    def test_binary_stream(self):
+        data = b"".join(Codec.stream_binary([self.frame, self.frame]))
+        frames = []
+        pos = 0
+        while pos < len(data):
+            size, pos = Codec.unpack_int(data, pos)
+            frames.append(Codec.decode_binary(data[pos:pos + size]))
+            pos += size
+        self.assertEqual([Codec.frame_to_dict(self.frame)] * 2, frames)
+
+    def test_varint(self):
+        for n in (0, 1, 127, 128, 300, 2 ** 40):
+            with self.subTest(n=n):
+                buf = bytearray()
+                Codec.pack_int(n, buf)
+                self.assertEqual((n, len(buf)), Codec.unpack_int(bytes(buf), 0))
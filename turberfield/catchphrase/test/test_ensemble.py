@@ -0,0 +1,146 @@
+#!/usr/bin/env python3
+# encoding: UTF-8
+
+# This file is part of turberfield.
+#
+# Turberfield is free software: you can redistribute it and/or modify it
+# under the terms of the GNU General Public License as published
+# by the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# Turberfield is distributed in the hope that it will be useful, but
+# WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with turberfield.  If not, see <http://www.gnu.org/licenses/>.
+
+import collections.abc
+import enum
+import textwrap
+import unittest
+
+from turberfield.catchphrase.ensemble import Ensemble
+from turberfield.catchphrase.parser import CommandParser
+from turberfield.catchphrase.presenter import Presenter
+from turberfield.dialogue.model import SceneScript
+from turberfield.dialogue.types import DataObject
+from turberfield.dialogue.types import Stateful
+
+
+class Location(enum.Enum):
+    hall = enum.auto()
+    yard = enum.auto()
+
+
+class Animal(Stateful, DataObject):
+    pass
+
+
+class Bird(Animal):
+    pass
+
+
+class Tool(DataObject):
+    pass
+
+
+class EnsembleTests(unittest.TestCase):
+
+    def setUp(self):
+        self.items = [
+            Bird(names=["Crow"]).set_state(Location.yard),
+            Tool(name="Spade"),
+            Animal(names=["Dog", "Rover"]).set_state(Location.hall),
+            Bird(names=["Magpie"]).set_state(Location.hall),
+            DataObject(),
+        ]
+        self.ensemble = Ensemble(self.items)
+
+    def test_sequence(self):
+        self.assertEqual(self.items, list(self.ensemble))
+        self.assertEqual(5, len(self.ensemble))
+        self.assertIs(self.items[1], self.ensemble[1])
+        self.assertEqual(["Crow", "Spade", "Dog", "Magpie", None], self.ensemble.names)
+
+    def test_of_type(self):
+        for typ in (Bird, Animal, Tool, DataObject, Stateful, object, (Tool, Bird), collections.abc.Hashable, int):
+            with self.subTest(typ=typ):
+                self.assertEqual([i for i in self.items if isinstance(i, typ)], self.ensemble.of_type(typ))
+
+    def test_named(self):
+        self.assertEqual([self.items[2]], self.ensemble.named("dog"))
+        self.assertEqual([], self.ensemble.named("rover"))
+
+    def test_states(self):
+        self.assertEqual(
+            [Location.yard, None, Location.hall, Location.hall, None], self.ensemble.states(Location)
+        )
+        self.assertEqual([self.items[2], self.items[3]], self.ensemble.in_state(Location.hall))
+
+        view = self.ensemble.at(Location.hall)
+        self.assertIsInstance(view, Ensemble)
+        self.assertEqual([self.items[3]], view.of_type(Bird))
+
+        self.items[0].set_state(Location.hall)
+        self.assertEqual(2, len(self.ensemble.at(Location.hall)))
+        self.assertEqual(3, len(self.ensemble.refresh().at(Location.hall)))
+
+    def test_unpack_annotation(self):
+        rv = list(CommandParser.unpack_annotation("obj", [Tool, Bird], self.ensemble))
+        self.assertEqual(list(CommandParser.unpack_annotation("obj", [Tool, Bird], self.items)), rv)
+        self.assertEqual(3, len(rv))
+
+    def test_casting_pool(self):
+        text = textwrap.dedent("""
+            .. entity:: ANIMAL
+               :types: turberfield.dialogue.types.Stateful
+
+            .. entity:: THING
+
+            Scene
+            =====
+
+            Shot
+            ----
+
+            [ANIMAL]_
+
+                I have the {THING.name}.
+
+        """)
+        script = SceneScript("inline", doc=SceneScript.read(text))
+        self.assertIs(self.ensemble, Presenter.casting_pool(script, self.ensemble))
+        self.assertIs(self.items, Presenter.casting_pool(script, self.items))
+
+        script = SceneScript("inline", doc=SceneScript.read(text.replace(
+            ".. entity:: THING", ".. entity:: THING\n   :types: turberfield.dialogue.types.DataObject"
+        )))
+        self.assertEqual(self.items, Presenter.casting_pool(script, self.ensemble))
+
+        script = SceneScript("inline", doc=SceneScript.read(
+            text.replace(".. entity:: THING", "").replace("{THING.name}", "spade")
+        ))
+        self.assertEqual(
+            [self.items[0], self.items[2], self.items[3]], Presenter.casting_pool(script, self.ensemble)
+        )
+
+    def test_build_from_text(self):
+        text = textwrap.dedent("""
+            .. entity:: ANIMAL
+               :types: turberfield.dialogue.types.Stateful
+
+            Scene
+            =====
+
+            Shot
+            ----
+
+            [ANIMAL]_
+
+                Woof.
+
+        """)
+        presenter = Presenter.build_from_text(text, ensemble=self.ensemble)
+        self.assertIs(self.items[0], presenter.casting["animal"])
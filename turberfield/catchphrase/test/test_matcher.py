@@ -118,3 +118,56 @@ class MatcherTests(unittest.TestCase):
                 self.assertEqual(2, len(rv), rv)
                 self.assertEqual("a_01", rv[0].metadata["arc"])
                 self.assertEqual("a_10", rv[1].metadata["arc"])
+
+
+class ScheduleTests(unittest.TestCase):
+
+    setUp = MatcherTests.setUp
+
+    def test_schedule_by_arc(self):
+        matcher = MultiMatcher(self.folders)
+        schedule = matcher.schedule(arc="a_11")
+        self.assertEqual(list(matcher.options(arc="a_11")), schedule.eligible)
+
+        rv = schedule.update(arc="a_12")
+        self.assertEqual(1, len(rv), rv)
+        self.assertEqual("a_12", rv[0].metadata["arc"])
+
+    def test_schedule_by_pathway(self):
+        matcher = MultiMatcher(self.folders)
+        pathways = set([("w12_latimer", "lockup")])
+        schedule = matcher.schedule(pathways=pathways)
+        self.assertEqual(list(matcher.options(pathways=pathways)), schedule.eligible)
+
+        rv = schedule.update(pathways=set([("w12_latimer", "cafe")]))
+        self.assertEqual(1, len(rv), rv)
+        self.assertEqual("a_12", rv[0].metadata["arc"])
+
+    def test_schedule_clock(self):
+        matcher = MultiMatcher(self.folders)
+        schedule = matcher.schedule()
+        clock = [0, 1, 4, 5, 2, "0", None, datetime.date(2020, 5, 2), datetime.date(2020, 5, 6), 3]
+        for t in clock:
+            with self.subTest(t=t):
+                self.assertEqual(list(matcher.options(t=t)), schedule.advance(t))
+
+    def test_schedule_equivalence(self):
+        folders = []
+        for n in range(60):
+            metadata = {"arc": "a_{0:02d}".format(n % 7), "pathways": frozenset([n % 5, n % 3])}
+            if n % 6:
+                metadata["min_t"] = n % 11
+            if n % 4:
+                metadata["max_t"] = n % 11 + n % 4
+            folders.append(
+                SceneScript.Folder(pkg=None, description=None, paths=None, interludes=None, metadata=metadata)
+            )
+
+        matcher = MultiMatcher(folders)
+        schedule = matcher.schedule(arc="a_03", pathways=set([4]))
+        for t in [0, 3, 3, 7, 20, 2, 9, 1.5, -1, 14]:
+            with self.subTest(t=t):
+                self.assertEqual(
+                    list(matcher.options(arc="a_03", t=t, pathways=set([4]))),
+                    schedule.advance(t)
+                )
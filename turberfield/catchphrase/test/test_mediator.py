@@ -16,10 +16,18 @@
 # You should have received a copy of the GNU General Public License
 # along with turberfield.  If not, see <http://www.gnu.org/licenses/>.
 
+import difflib
+import string
 import textwrap
 import unittest
+import warnings
 
+from turberfield.catchphrase.mediator import Facts
 from turberfield.catchphrase.mediator import Mediator
+from turberfield.catchphrase.mediator import Members
+from turberfield.catchphrase.parser import CommandParser
+from turberfield.catchphrase import telemetry
+from turberfield.dialogue.types import DataObject
 
 
 class Trivial(Mediator):
@@ -67,6 +75,43 @@ class MediatorMatchTests(unittest.TestCase):
         self.assertFalse(kwargs)
 
 
+class MediatorGrammarTests(unittest.TestCase):
+
+    def test_compiled_on_definition(self):
+        grammar = Trivial.compile()
+        self.assertEqual({"do_this", "do_that", "do_tother"}, set(grammar))
+        self.assertEqual(("that?",), grammar["do_that"].terms)
+
+        info = CommandParser.compile_function.cache_info()
+        self.assertIs(grammar["do_this"], CommandParser.compile(Trivial("do_this").do_this))
+        self.assertEqual(info.misses, CommandParser.compile_function.cache_info().misses)
+
+    def test_subclass(self):
+
+        class Subclass(Trivial):
+
+            def do_more(self, this, text, context):
+                """
+                More?
+
+                """
+
+        self.assertIn("do_more", Subclass.compile())
+        self.assertIs(Trivial.compile()["do_this"], Subclass.compile()["do_this"])
+
+    def test_helper_docstring(self):
+
+        class Subclass(Trivial):
+
+            def strip(self, text):
+                """Strip trailing } characters."""
+                return text.rstrip("}")
+
+        mediator = Subclass("do_that")
+        fn, args, kwargs = mediator.interpret(mediator.match("that?"))
+        self.assertEqual(mediator.do_that, fn)
+
+
 class MediatorFactsTests(unittest.TestCase):
 
     def setUp(self):
@@ -109,3 +154,261 @@ class MediatorFactsTests(unittest.TestCase):
         self.assertEqual("Or,\nMaybe;\nTother.", data)
         self.assertFalse(self.mediator.facts[fn.__name__])
 
+
+
+class MediatorCacheTests(unittest.TestCase):
+
+    def test_disabled(self):
+        mediator = Trivial("do_this", "do_that", "do_tother")
+        list(mediator.match("that?"))
+        list(mediator.match("that?"))
+        self.assertEqual((0, 0, 0, 0), tuple(mediator.cache_info()))
+
+    def test_hits(self):
+        mediator = Trivial("do_this", "do_that", "do_tother", cache_size=8)
+        for text in ("that?", "That?", " that? ", "release the frog", "release the frog"):
+            fn, args, kwargs = mediator.interpret(mediator.match(text, context="ctx"))
+            self.assertEqual([text, "ctx"], args)
+            self.assertEqual(None if "frog" in text else mediator.do_that, fn)
+        self.assertEqual((3, 2, 8, 2), tuple(mediator.cache_info()))
+
+    def test_active_changes(self):
+        mediator = Trivial("do_this", "do_that", "do_tother", cache_size=8)
+        fn, args, kwargs = mediator.interpret(mediator.match("that?"))
+        self.assertEqual(mediator.do_that, fn)
+
+        mediator.active.discard(mediator.do_that)
+        fn, args, kwargs = mediator.interpret(mediator.match("that?"))
+        self.assertIsNone(fn)
+        self.assertEqual(2, mediator.cache_info().misses)
+
+    def test_parent_changes(self):
+
+        class Story(Mediator):
+
+            def do_take(self, this, text, context, obj: "portable"):
+                """
+                take {obj.name}
+                """
+
+        mediator = Story("do_take", cache_size=8)
+        mediator.portable = [DataObject(name="Crow")]
+        fn, args, kwargs = mediator.interpret(mediator.match("take crow"))
+        self.assertEqual(mediator.do_take, fn)
+
+        mediator.portable = [DataObject(name="Spade")]
+        fn, args, kwargs = mediator.interpret(mediator.match("take crow"))
+        self.assertIsNone(fn)
+        fn, args, kwargs = mediator.interpret(mediator.match("take spade"))
+        self.assertIs(mediator.portable[0], kwargs["obj"])
+
+        mediator.portable.append(DataObject(name="Crow"))
+        fn, args, kwargs = mediator.interpret(mediator.match("take crow"))
+        self.assertIs(mediator.portable[1], kwargs["obj"])
+        self.assertEqual((0, 4, 8, 4), tuple(mediator.cache_info()))
+
+    def test_kwargs_not_shared(self):
+        mediator = Workshop("do_put", cache_size=8)
+        ensemble = [DataObject(name="Crow"), DataObject(name="Box")]
+        fn, args, kwargs = mediator.interpret(mediator.match("put crow in box", ensemble=ensemble))
+        kwargs["obj"] = "tampered"
+        fn, args, kwargs = mediator.interpret(mediator.match("put crow in box", ensemble=ensemble))
+        self.assertIs(ensemble[0], kwargs["obj"])
+        self.assertEqual(1, mediator.cache_info().hits)
+
+    def test_members(self):
+        items = [DataObject(name="Crow")]
+        key = Members(items)
+        self.assertEqual(key, Members(list(items)))
+        self.assertNotEqual(key, Members([DataObject(name="Crow")]))
+        self.assertIs(items[0], key.items[0])
+
+    def test_eviction(self):
+        mediator = Trivial("do_this", "do_that", "do_tother", cache_size=2)
+        for text in ("this?", "that?", "or?", "this?"):
+            list(mediator.match(text))
+        self.assertEqual((0, 4, 2, 2), tuple(mediator.cache_info()))
+
+
+class Workshop(Mediator):
+
+    def do_put(self, this, text, context, obj: DataObject, box: DataObject):
+        """
+        put {obj.name} in {box.name}
+        place {obj.name} into {box.name}
+
+        """
+
+    def do_look(self, this, text, context):
+        """
+        look
+
+        """
+
+
+class MediatorBudgetTests(unittest.TestCase):
+
+    def setUp(self):
+        self.ensemble = [DataObject(name="thing {0:02d}".format(n)) for n in range(20)]
+        self.collector = telemetry.register(telemetry.Collector())
+
+    def tearDown(self):
+        telemetry.unregister(self.collector)
+
+    def test_estimate(self):
+        mediator = Workshop("do_put", "do_look")
+        self.assertEqual(800, CommandParser.estimate(mediator.do_put, self.ensemble, parent=mediator))
+        self.assertEqual(1, CommandParser.estimate(mediator.do_look, self.ensemble, parent=mediator))
+
+    def test_within_budget(self):
+        mediator = Workshop("do_put", "do_look", budget=CommandParser.Budget(phrases=1000))
+        with warnings.catch_warnings():
+            warnings.simplefilter("error")
+            fn, args, kwargs = mediator.interpret(mediator.match("put thing 03 in thing 11", ensemble=self.ensemble))
+        self.assertEqual(mediator.do_put, fn)
+        self.assertEqual(0, self.collector.counters["parser.over_budget"])
+
+    def test_phrases(self):
+        budgets = [CommandParser.Budget(phrases=100), CommandParser.Budget(total=100), CommandParser.Budget(seconds=0)]
+        for budget in budgets:
+            mediator = Workshop("do_put", "do_look", budget=budget)
+            with self.subTest(budget=budget), self.assertWarns(RuntimeWarning):
+                fn, args, kwargs = mediator.interpret(
+                    mediator.match("place the thing 03 into thing 11", ensemble=self.ensemble)
+                )
+                self.assertEqual(mediator.do_put, fn)
+                self.assertIs(self.ensemble[3], kwargs["obj"])
+                self.assertIs(self.ensemble[11], kwargs["box"])
+
+        self.assertEqual(4, self.collector.counters["parser.over_budget"])
+
+    def test_slots_are_exact(self):
+        mediator = Workshop("do_put", "do_look", budget=CommandParser.Budget(phrases=100))
+        with self.assertWarns(RuntimeWarning):
+            rv = list(mediator.match("put thing 03 in thing 99", ensemble=self.ensemble))
+        self.assertEqual([(None, ["put thing 03 in thing 99", None], {})], rv)
+
+        with self.assertWarns(RuntimeWarning):
+            fn, args, kwargs = mediator.interpret(mediator.match("look", ensemble=self.ensemble))
+        self.assertEqual(mediator.do_look, fn)
+
+    def test_slots_rank_with_phrases(self):
+
+        class Store(Workshop):
+
+            def do_stash(self, this, text, context):
+                """
+                put thing 03 in thing 11
+                put thing 03 in thing 12
+                """
+
+        mediator = Store("do_put", "do_stash", budget=CommandParser.Budget(phrases=100))
+        with self.assertWarns(RuntimeWarning):
+            rv = list(mediator.match("put thing 03 in thing 11", ensemble=self.ensemble))
+        self.assertEqual([mediator.do_stash, mediator.do_put], [i[0] for i in rv])
+        self.assertIs(self.ensemble[11], rv[1][2]["box"])
+
+        with self.assertWarns(RuntimeWarning):
+            rv = list(mediator.match("put thing 03 in thing 11", ensemble=self.ensemble, n=2, cutoff=0.6))
+        self.assertEqual([mediator.do_stash, mediator.do_put, mediator.do_stash], [i.fn for i in rv])
+        self.assertEqual([1.0, 1.0], [i.score for i in rv[:2]])
+        self.assertLess(rv[2].score, 1.0)
+
+        with self.assertWarns(RuntimeWarning):
+            rv = list(mediator.match("put thing 03 in thing 19", ensemble=self.ensemble, n=1, cutoff=0.6))
+        self.assertEqual([mediator.do_put], [i[0] for i in rv])
+
+
+class MediatorRankTests(unittest.TestCase):
+
+    def test_rank_like_difflib(self):
+        words = ["look", "look around", "lock door", "look at door", "unlock door", "lookout", "book"]
+        for word in ["look", "lok", "lock", "unlock the door", "zzz"]:
+            for n in (1, 3, 10):
+                for cutoff in (0.3, 0.6, 0.95):
+                    with self.subTest(word=word, n=n, cutoff=cutoff):
+                        rv = Mediator.rank(word, words, n=n, cutoff=cutoff)
+                        self.assertEqual(
+                            difflib.get_close_matches(word, words, n=n, cutoff=cutoff),
+                            [i[1] for i in rv]
+                        )
+                        self.assertEqual(sorted(rv, reverse=True), rv)
+
+    def test_candidates(self):
+        mediator = Trivial("do_this", "do_that", "do_tother")
+        rv = list(mediator.match("this?", context="ctx", cutoff=0.5, n=3))
+        self.assertEqual(2, len(rv), rv)
+        self.assertEqual(mediator.do_this, rv[0].fn)
+        self.assertEqual(1.0, rv[0].score)
+        self.assertEqual(mediator.do_that, rv[1].fn)
+        self.assertLess(rv[1].score, 1.0)
+        self.assertEqual(["this?", "ctx"], rv[1].args)
+
+        fn, args, kwargs = mediator.interpret(rv)
+        self.assertEqual(mediator.do_this, fn)
+
+    def test_no_candidates(self):
+        mediator = Trivial("do_this", "do_that", "do_tother")
+        rv = list(mediator.match("release the frog", n=3))
+        self.assertEqual(1, len(rv), rv)
+        self.assertEqual((None, ["release the frog", None], {}), mediator.interpret(rv))
+
+
+class FactsTests(unittest.TestCase):
+
+    def test_mapping(self):
+        facts = Facts(colour="red")
+        self.assertEqual("red", facts["colour"])
+        self.assertEqual("", facts["size"])
+        self.assertNotIn("size", facts)
+        self.assertIsNone(facts.get("size"))
+        self.assertEqual({"colour": "red"}, dict(facts))
+        self.assertEqual(
+            "A red box. ",
+            string.Formatter().vformat("A {colour} box. {size}", [], facts)
+        )
+
+    def test_missing(self):
+        facts = Facts(colour="red")
+        self.assertIsNone(facts.pop("size", None))
+        self.assertRaises(KeyError, facts.pop, "size")
+        self.assertEqual("red", facts.pop("colour"))
+        self.assertNotIn("colour", facts)
+
+        self.assertEqual(0, facts.setdefault("n", 0))
+        self.assertEqual(0, facts["n"])
+        self.assertEqual(0, facts.setdefault("n", 1))
+        self.assertEqual({"colour", "n"}, facts.changed())
+
+        with self.assertRaises(KeyError):
+            del facts["size"]
+        self.assertNotIn("size", facts.changed())
+
+    def test_versions(self):
+        facts = Facts()
+        self.assertEqual(0, facts.version)
+        facts["colour"] = "red"
+        facts["size"] = "big"
+        version = facts.version
+        facts["colour"] = "red"
+        self.assertEqual(version, facts.version)
+        self.assertFalse(facts.changed(version))
+
+        facts["colour"] = "blue"
+        self.assertEqual({"colour"}, facts.changed(version))
+        self.assertEqual({"colour", "size"}, facts.changed())
+
+        del facts["size"]
+        self.assertEqual({"colour", "size"}, facts.changed(version))
+
+    def test_stamp(self):
+        facts = Facts(colour="red")
+        one = facts.stamp(["colour", "size"])
+        facts["shape"] = "square"
+        self.assertEqual(one, facts.stamp(["colour", "size"]))
+        facts["size"] = "big"
+        self.assertNotEqual(one, facts.stamp(["colour", "size"]))
+
+    def test_mediator(self):
+        mediator = Trivial("do_this")
+        self.assertIsInstance(mediator.facts, Facts)
@@ -18,10 +18,12 @@
 
 
 import enum
+import sys
 from types import SimpleNamespace
 import unittest
 
 from turberfield.catchphrase.parser import CommandParser
+from turberfield.catchphrase.parser import Tokenizer
 
 from turberfield.dialogue.types import DataObject
 
@@ -215,3 +217,132 @@ class ParserTests(unittest.TestCase):
         self.assertIn("pick up red thing", rv)
         self.assertEqual("red", rv["pick up red thing"][1]["obj"].colour)
 
+
+
+class GrammarTests(unittest.TestCase):
+
+    def test_static_annotations(self):
+        self.assertTrue(CommandParser.is_static(ParserTests.Location))
+        self.assertTrue(CommandParser.is_static([ParserTests.Location, "here"]))
+        self.assertFalse(CommandParser.is_static([ParserTests.Location, ParserTests.Liquid]))
+        self.assertFalse(CommandParser.is_static("follows"))
+
+    def test_compile(self):
+
+        def func(locn: ParserTests.Location, obj: ParserTests.Liquid, n=0):
+            """
+            pour the {obj.name} {locn.value} | Empty {obj.name}.
+            """
+
+        grammar = CommandParser.compile(func)
+        self.assertEqual(("pour {obj.name} {locn.value}", "empty {obj.name}"), grammar.terms)
+        self.assertEqual(["locn", "obj"], [i[0] for i in grammar.params])
+        self.assertEqual(
+            (("locn", ParserTests.Location.HERE), ("locn", ParserTests.Location.THERE)),
+            grammar.params[0][1]
+        )
+        self.assertIs(ParserTests.Liquid, grammar.params[1][1])
+        self.assertIsNone(CommandParser.phrase_table(func))
+        self.assertIs(grammar, CommandParser.compile(func))
+
+        rv = dict(CommandParser.expand_commands(func, ensemble=[ParserTests.Liquid(name="Tea")]))
+        self.assertEqual({"pour tea here", "pour tea there", "empty tea"}, set(rv))
+
+    def test_expand_enum(self):
+        class Season(enum.Enum):
+            spring = ["Spring", "Springtime"]
+            summer = "Summer"
+
+        rv = CommandParser.expand_enum(Season)
+        self.assertEqual((Season.spring, Season.spring, Season.summer), rv)
+        self.assertIs(rv, CommandParser.expand_enum(Season))
+
+    def test_static_phrases(self):
+
+        def func(locn: ParserTests.Location, n: [1, 2]):
+            """
+            go {locn.value} {n} times
+            Stay.
+            """
+
+        table = CommandParser.phrase_table(func)
+        self.assertEqual(8, len(table))
+        self.assertIn(("go there 2 times", (("locn", ParserTests.Location.THERE), ("n", 2))), table)
+        self.assertEqual(("stay", (("locn", ParserTests.Location.HERE), ("n", 1))), table[4])
+        self.assertIs(table, CommandParser.phrase_table(func))
+
+        rv = list(CommandParser.expand_commands(func, ensemble=[ParserTests.Liquid(name="Tea")]))
+        self.assertEqual([(p, (func, dict(k))) for p, k in table], rv)
+
+    def test_static_kwargs_not_shared(self):
+
+        def func(locn: ParserTests.Location):
+            """
+            go {locn.value}
+            """
+
+        first = dict(CommandParser.expand_commands(func))
+        first["go here"][1]["extra"] = 1
+        second = dict(CommandParser.expand_commands(func))
+        self.assertEqual({"locn": ParserTests.Location.HERE}, second["go here"][1])
+
+    def test_not_a_format_string(self):
+
+        def func(n: [1, 2]):
+            """
+            Strip trailing } characters.
+            """
+
+        self.assertEqual(1, len(CommandParser.compile(func).terms))
+        self.assertEqual((), CommandParser.phrase_table(func))
+        self.assertEqual([], list(CommandParser.expand_commands(func)))
+        self.assertEqual([], list(CommandParser.match_slots(func, "strip trailing } characters")))
+
+    def test_bound_methods_share(self):
+
+        class Story:
+
+            def pour(self, obj: ParserTests.Liquid):
+                """
+                pour {obj.name}
+                """
+
+        self.assertIs(CommandParser.compile(Story().pour), CommandParser.compile(Story().pour))
+
+
+class TokenizerTests(unittest.TestCase):
+
+    def test_discard(self):
+        tokenizer = Tokenizer(CommandParser.discard)
+        self.assertEqual(["pick", "up", "{obj.name}"], tokenizer.tokens("Pick up the {obj.name}"))
+        self.assertEqual(["pick", "up", "the", "{obj.name}"], tokenizer.tokens("Pick up the {obj.name}."))
+
+    def test_parse_tokens(self):
+        for text, discard, preserver, expected in [
+            ("Give the apple to my friend", CommandParser.discard, ".", ["give", "apple", "to", "friend"]),
+            ("Give the apple to my friend", None, ".", ["give", "the", "apple", "to", "my", "friend"]),
+            ("Give the apple.", {"the"}, ".", ["give", "the", "apple"]),
+            ("Give the apple!", ["the"], "!", ["give", "the", "apple"]),
+            ("  Give  the apple ", ("the",), ".", ["give", "apple"]),
+        ]:
+            with self.subTest(text=text, discard=discard, preserver=preserver):
+                self.assertEqual(expected, CommandParser.parse_tokens(text, preserver, discard))
+
+    def test_interned(self):
+
+        def func():
+            """
+            look
+            """
+
+        term = CommandParser.compile(func).terms[0]
+        self.assertIs(sys.intern("".join(["lo", "ok"])), term)
+
+    def test_ids(self):
+        tokenizer = Tokenizer()
+        vocabulary = {}
+        one = tokenizer.ids(tokenizer.tokens("go north then go south"), vocabulary)
+        two = tokenizer.ids(tokenizer.tokens("south"), vocabulary)
+        self.assertEqual([0, 1, 2, 0, 3], list(one))
+        self.assertEqual([3], list(two))
+        self.assertFalse(hasattr(CommandParser.tokenizer, "vocabulary"))
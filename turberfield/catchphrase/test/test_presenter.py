@@ -151,3 +151,13 @@ class PresenterMetadataTests(unittest.TestCase):
         presenter = Presenter.build_from_text(text)
         self.assertEqual(0.25, presenter.dwell)
         self.assertEqual(0.0, presenter.pause)
+
+
+class PresenterReferencesTests(unittest.TestCase):
+
+    def test_references(self):
+        text = textwrap.dedent("""
+        {0} has {weather} weather.
+        The {item.name} is {items[0]} and {} and {colour:>8}.
+        """)
+        self.assertEqual({"weather", "item", "items", "colour"}, Presenter.references(text))
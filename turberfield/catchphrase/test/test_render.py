@@ -1,10 +1,18 @@
 import unittest
 
 
+import gzip
+import json
+import re
 import textwrap
+import urllib.parse
 import uuid
 
 from turberfield.catchphrase.presenter import Presenter
+from turberfield.catchphrase.render import Action
+from turberfield.catchphrase.render import Delta
+from turberfield.catchphrase.render import Parameter
+from turberfield.catchphrase.render import RenderCache
 from turberfield.catchphrase.render import Renderer
 
 from turberfield.dialogue.model import SceneScript
@@ -126,3 +134,259 @@ class RenderTests(unittest.TestCase):
         self.assertIn('poster="/img/cover.jpg"', rv)
         self.assertIn('<a href="http://vimeo.com/abcdef/">', rv)
         self.assertIn("Download MP4", rv)
+
+
+class StreamTests(unittest.TestCase):
+
+    def setUp(self):
+        text = textwrap.dedent("""
+        Scene
+        =====
+
+        Shot
+        ----
+
+        .. fx:: pot.mp3  crow_call-3s.mp3
+           :offset: 0
+           :duration: 3000
+           :loop: 1
+
+        Caw.
+
+        Caw, caw.
+
+        """)
+        presenter = Presenter.build_from_text(text)
+        self.frame = presenter.animate(presenter.frames[0])
+
+    def test_stream_animated_frame(self):
+        controls = ["<button>Go</button>", "<button>Stop</button>"]
+        rv = list(Renderer.stream_animated_frame_to_html(self.frame, controls))
+        self.assertGreater(len(rv), len(self.frame[Model.Line]))
+        self.assertEqual(Renderer.render_animated_frame_to_html(self.frame, controls), "".join(rv))
+
+    def test_stream_body(self):
+        rv = list(Renderer.stream_body_html(self.frame, title="Test page", style=":root {}"))
+        self.assertTrue(all(isinstance(i, bytes) for i in rv))
+        self.assertIn(b"<h1><span>Test</span> <span>Page</span></h1>", rv[0])
+        self.assertNotIn(b"<main", rv[0])
+
+        page = Renderer.render_body_html(title="Test page").format(
+            "", ":root {}", Renderer.render_animated_frame_to_html(self.frame)
+        )
+        self.assertEqual(page.encode("utf-8"), b"".join(rv))
+
+
+class DeltaTests(unittest.TestCase):
+
+    def setUp(self):
+        text = textwrap.dedent("""
+        Scene
+        =====
+
+        Shot
+        ----
+
+        Caw.
+
+        Caw, caw.
+
+        Shot
+        ----
+
+        .. fx:: pot.mp3  crow_call-3s.mp3
+           :offset: 0
+           :duration: 3000
+           :loop: 1
+
+        Caw!
+
+        """)
+        presenter = Presenter.build_from_text(text)
+        self.frames = [presenter.animate(i) for i in presenter.frames]
+
+    def test_regions(self):
+        regions = Renderer.frame_regions(self.frames[0], ["<button>Go</button>"])
+        self.assertEqual(2, len(regions["lines"]))
+        self.assertFalse(regions["audio"])
+        html = Renderer.render_animated_frame_to_html(self.frames[0], ["<button>Go</button>"])
+        self.assertIn("\n".join(regions["lines"]), html)
+        self.assertIn("\n".join(regions["controls"]), html)
+        for frame in self.frames:
+            with self.subTest(frame=frame):
+                self.assertEqual(
+                    Renderer.render_animated_frame_to_html(frame, ["<button>Go</button>"]),
+                    Renderer.render_regions_to_html(Renderer.frame_regions(frame, ["<button>Go</button>"]))
+                )
+
+    def test_first_page(self):
+        delta = Delta()
+        typ, text = delta.render(self.frames[0], title="Test page", style=":root {}")
+        self.assertEqual("text/html", typ)
+        self.assertEqual(
+            b"".join(Renderer.stream_body_html(self.frames[0], title="Test page", style=":root {}")),
+            text.encode("utf-8")
+        )
+
+    def test_patches(self):
+        delta = Delta()
+        first = dict(self.frames[0])
+        first[Model.Line] = first[Model.Line][:1]
+        delta.render(first, ["<button>Go</button>"])
+        self.assertEqual([], delta.patch(first, ["<button>Go</button>"]))
+
+        rv = delta.patch(self.frames[0], ["<button>Stop</button>"])
+        self.assertEqual(["append", "replace"], [i.op for i in rv])
+        self.assertEqual("main.catchphrase-reveal > ul", rv[0].selector)
+        self.assertIn("Caw, caw.", rv[0].html)
+        self.assertNotIn("Caw.</p>", rv[0].html)
+        self.assertIn("Stop", rv[1].html)
+
+        typ, text = delta.render(self.frames[0], ["<button>Stop</button>"], style=":root {}")
+        self.assertEqual("application/json", typ)
+        self.assertEqual([{"op": "replace", "selector": "body > style", "html": ":root {}"}], json.loads(text))
+
+    def test_page_changes(self):
+        delta = Delta()
+        delta.render(self.frames[0], title="One")
+        self.assertEqual([], delta.patch(self.frames[0], title="One"))
+
+        typ, text = delta.render(self.frames[0], title="Two", refresh=5, next_="/next")
+        self.assertEqual("text/html", typ)
+        self.assertIn("<title>Two</title>", text)
+        self.assertIn('content="5;/next"', text)
+
+        self.assertIsNone(delta.patch(self.frames[0], title="Two", head="<script></script>"))
+
+    def test_media(self):
+        delta = Delta()
+        delta.render(self.frames[0])
+        self.assertIsNone(delta.patch(self.frames[1]))
+        typ, text = delta.render(self.frames[1])
+        self.assertEqual("text/html", typ)
+        self.assertIn("crow_call-3s.mp3", text)
+
+
+class RenderCacheTests(unittest.TestCase):
+
+    text = textwrap.dedent("""
+    Scene
+    =====
+
+    Shot
+    ----
+
+    Caw.
+
+    Caw, caw.
+
+    """)
+
+    def build(self, text=None, dwell=None, pause=None):
+        presenter = Presenter.build_from_text(text or self.text)
+        presenter.animate(
+            presenter.frames[0],
+            dwell=presenter.dwell if dwell is None else dwell,
+            pause=presenter.pause if pause is None else pause
+        )
+        return presenter
+
+    def test_hit(self):
+        cache = RenderCache()
+        one = cache.render(self.build(), 0)
+        two = cache.render(self.build(), 0)
+        self.assertEqual(one, two)
+        self.assertEqual((1, 1, 128, 1), tuple(cache.info()))
+        self.assertTrue(one.etag.startswith('"'))
+        self.assertIn(b"Caw, caw.", one.data)
+        self.assertIsNone(one.gzip)
+
+    def test_miss(self):
+        cache = RenderCache()
+        presenter = self.build()
+        one = cache.render(presenter, 0)
+        two = cache.render(self.build(pause=2.0), 0)
+        three = cache.render(presenter, 0, controls=["<button>Go</button>"])
+        four = cache.render(self.build(self.text.replace("Caw.", "Coo.")), 0)
+        self.assertEqual(4, len({one.etag, two.etag, three.etag, four.etag}))
+        self.assertEqual(4, cache.info().misses)
+
+    def test_eviction(self):
+        cache = RenderCache(maxsize=1)
+        presenter = self.build()
+        one = cache.render(presenter, 0)
+        two = cache.render(self.build(pause=2.0), 0)
+        self.assertEqual(1, cache.info().currsize)
+        self.assertIsNone(cache.get(one.etag.strip('"')))
+        self.assertEqual(two, cache.get(two.etag.strip('"')))
+
+    def test_timing(self):
+        cache = RenderCache()
+        one = cache.render(self.build(), 0)
+        two = cache.render(self.build(dwell=2.0, pause=5), 0)
+        self.assertNotEqual(one.etag, two.etag)
+        self.assertNotEqual(one.data, two.data)
+        self.assertEqual(2, cache.info().misses)
+
+    def test_compress(self):
+        cache = RenderCache(compress=True)
+        entry = cache.render(self.build(), 0)
+        self.assertEqual(entry.data, gzip.decompress(entry.gzip))
+
+
+class ActionFormTests(unittest.TestCase):
+
+    def setUp(self):
+        self.action = Action(
+            name="cmd", rel="canonical", typ="/{0}/cmd/{1}", ref=("a b", "c&d"), method="post",
+            parameters=[
+                Parameter("cmd", True, re.compile("[\\w ]+"), [], "Enter a <command>"),
+                Parameter("name", False, None, ["Anon"], "Your name."),
+                Parameter("colour", False, None, ["red", "blue"], "Pick one."),
+            ],
+            prompt="Enter"
+        )
+
+    def test_render(self):
+        rv = list(Renderer.render_action_form(self.action))
+        self.assertEqual(
+            '<form role="form" action="/a%20b/cmd/c%26d" method="post" name="cmd">', rv[0]
+        )
+        self.assertEqual("<fieldset>", rv[1])
+        self.assertIn("Enter a &lt;command&gt;</label>", rv[2])
+        self.assertIn('title="Enter a &lt;command&gt;"', rv[3])
+        self.assertIn('required="required"', rv[3])
+        self.assertNotIn("autofocus", "".join(rv))
+        self.assertIn('placeholder="Anon"', rv[4])
+        self.assertEqual('<option value="blue">blue</option>', rv[7])
+        self.assertEqual(['<button type="submit">Enter</button>', "</fieldset>", "</form>"], rv[-3:])
+
+    def test_autofocus(self):
+        rv = "\n".join(Renderer.render_action_form(self.action, autofocus=True))
+        self.assertEqual(2, rv.count('autofocus="autofocus"'))
+
+    def test_cached(self):
+        Renderer.compile_action_form.cache_clear()
+        one = list(Renderer.render_action_form(self.action))
+        two = list(Renderer.render_action_form(self.action._replace(ref=("e", "f"))))
+        self.assertEqual(one[1:], two[1:])
+        self.assertIn('action="/e/cmd/f"', two[0])
+        self.assertEqual(1, Renderer.compile_action_form.cache_info().hits)
+
+    def test_no_parameters(self):
+        action = self.action._replace(parameters=[], ref=())
+        self.assertEqual(['<button type="submit">Enter</button>'], list(Renderer.render_action_form(action)))
+
+    def test_compile_url(self):
+        for typ, ref in [
+            ("/{0}/cmd/", ("a b",)),
+            ("/{}/{}", ("x/y", 3)),
+            ("/{0[1]}/{1:03d}", (("p", "q r"), 7)),
+            ("/static", ()),
+        ]:
+            with self.subTest(typ=typ, ref=ref):
+                url = "".join(
+                    literal + (urllib.parse.quote(fmt.format(*ref)) if fmt else "")
+                    for literal, fmt in Renderer.compile_url(typ)
+                )
+                self.assertEqual(urllib.parse.quote(typ.format(*ref)), url)
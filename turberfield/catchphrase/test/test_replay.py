@@ -0,0 +1,124 @@
+#!/usr/bin/env python3
+# encoding: UTF-8
+
+# This file is part of turberfield.
+#
+# Turberfield is free software: you can redistribute it and/or modify it
+# under the terms of the GNU General Public License as published
+# by the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# Turberfield is distributed in the hope that it will be useful, but
+# WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with turberfield.  If not, see <http://www.gnu.org/licenses/>.
+
+import contextlib
+import io
+import json
+import multiprocessing
+import pathlib
+import tempfile
+import unittest
+
+from turberfield.catchphrase.mediator import Mediator
+from turberfield.catchphrase.presenter import Presenter
+from turberfield.catchphrase import replay
+from turberfield.dialogue.types import DataObject
+
+
+class Story(Mediator):
+
+    def do_look(self, this, text, context, obj: DataObject):
+        """
+        look at {obj.name}
+        """
+        return "You see the {0.name}.".format(obj)
+
+
+ensemble = [DataObject(name="Crow"), DataObject(name="Spade")]
+
+
+def session():
+    story = Story("do_look")
+
+    def turn(text):
+        fn, args, kwargs = story.interpret(story.match(text, ensemble=ensemble))
+        if fn:
+            presenter = Presenter.build_from_text(story(fn, *args, **kwargs))
+            return [presenter.animate(frame) for frame in presenter.frames]
+
+    return turn
+
+
+class ReplayTests(unittest.TestCase):
+
+    def test_capture(self):
+        turn = session()
+        story = Story("do_look")
+        for text in ("look at crow", "Look at my Crow", "wave"):
+            fn, args, kwargs = story.interpret(story.match(text, ensemble=ensemble))
+            if fn:
+                story(fn, *args, **kwargs)
+
+        self.assertEqual(["look at crow", "look at my crow"], replay.capture(story, ensemble))
+        self.assertEqual(["look at crow", "Look at my Crow"], replay.capture(story, anonymous=False))
+
+    def test_capture_matches(self):
+        story = Story("do_look")
+        for text in ("Look at the Crow", "look at my spade", "Look at their crow"):
+            fn, args, kwargs = story.interpret(story.match(text, ensemble=ensemble))
+            if fn:
+                story(fn, *args, **kwargs)
+
+        captured = replay.capture(story, ensemble)
+        self.assertEqual(["look at the crow", "look at my spade", "look at their crow"], captured)
+        for text, record in zip(captured, reversed(story.history)):
+            with self.subTest(text=text):
+                fn, args, kwargs = story.interpret(Story("do_look").match(text, ensemble=ensemble))
+                self.assertEqual(record.name, fn.__name__)
+
+    def test_dump_and_read(self):
+        sessions = [["look at crow"], ["look at spade", "wave"]]
+        stream = io.StringIO()
+        replay.dump(sessions, stream)
+        stream.seek(0)
+        self.assertEqual(sessions, replay.read(stream))
+
+    def test_replay(self):
+        sessions = [["look at crow", "look at spade"], ["wave", "look at crow"]]
+        results = replay.replay(session, sessions)
+        self.assertEqual(1, len(results))
+        self.assertEqual(4, results[0].commands)
+
+        rv = replay.report(results)
+        self.assertEqual(4, rv["commands"])
+        self.assertEqual(4, rv["stages"]["replay.turn"]["count"])
+        self.assertEqual(3, rv["stages"]["mediator.call"]["count"])
+        self.assertIn("renderer.render_animated_frame_to_html", rv["stages"])
+        self.assertGreater(rv["commands_per_s"], 0)
+
+    @unittest.skipUnless("fork" in multiprocessing.get_all_start_methods(), "Requires fork")
+    def test_concurrency(self):
+        sessions = [["look at crow"], ["look at spade"], ["look at crow", "wave"]]
+        results = replay.replay(session, sessions, concurrency=2)
+        self.assertEqual([3, 1], [i.commands for i in results])
+        self.assertEqual(4, replay.report(results)["stages"]["replay.turn"]["count"])
+
+    def test_main(self):
+        with tempfile.TemporaryDirectory() as parent:
+            path = pathlib.Path(parent, "sessions.jsonl")
+            path.write_text('["look at crow", "look at spade"]\n', encoding="utf-8")
+            args = replay.parser().parse_args(
+                ["turberfield.catchphrase.test.test_replay:session", str(path), "--repeat", "2", "--json"]
+            )
+            output = io.StringIO()
+            with contextlib.redirect_stdout(output):
+                rv = replay.main(args)
+
+        self.assertEqual(0, rv)
+        self.assertEqual(4, json.loads(output.getvalue())["commands"])
+
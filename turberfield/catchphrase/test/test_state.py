@@ -21,11 +21,18 @@ import unittest
 #
 
 import enum
+import random
 from collections import Counter
 from collections import defaultdict
 import re
 from types import SimpleNamespace
 
+from turberfield.catchphrase.presenter import Presenter
+from turberfield.catchphrase.state import Impulsive as Tallied
+from turberfield.catchphrase.state import Net
+from turberfield.catchphrase.state import Tally
+from turberfield.dialogue.model import Model
+from turberfield.dialogue.types import DataObject
 from turberfield.dialogue.types import EnumFactory
 from turberfield.dialogue.types import Stateful
 
@@ -124,3 +131,179 @@ class StateTests(unittest.TestCase):
         obj.state = self.Crossing.arrived
         self.assertEqual(self.Crossing.arrived, obj.get_state(self.Crossing))
 
+
+class TallyTests(unittest.TestCase):
+
+    Crossing = StateTests.Crossing
+
+    class Pedestrian(Tallied, DataObject):
+        pass
+
+    def tearDown(self):
+        Tallied.clock = 0
+
+    def test_compatibility(self):
+        obj = self.Pedestrian(name="Ted")
+        self.assertEqual(0, obj.get_state(self.Crossing))
+        self.assertEqual(0, obj.state)
+        obj.state = self.Crossing.waiting
+        self.assertEqual(self.Crossing.waiting, obj.get_state(self.Crossing))
+        obj.set_state(self.Crossing.walking, 3)
+        self.assertEqual(self.Crossing.walking, obj.get_state(self.Crossing))
+        self.assertEqual(3, obj.state)
+        self.assertEqual("Ted", obj.name)
+
+    def test_regex(self):
+        fmt = "{0.tally[Crossing]:02}"
+        regex = re.compile("(?P<even>\\d+[02468])|(?P<odd>\\d+[13579])")
+        obj = self.Pedestrian()
+        obj.state = self.Crossing.waiting
+        for n in range(64):
+            obj.state = self.Crossing.waiting
+            text = fmt.format(obj)
+            with self.subTest(n=n, text=text):
+                self.assertEqual("{0:02}".format(n + 2), text)
+                self.assertEqual("odd" if n % 2 else "even", regex.match(text).lastgroup)
+
+    def test_dwell(self):
+        obj = self.Pedestrian()
+        obj.set_state(self.Crossing.waiting, self.Crossing.waiting, self.Crossing.walking)
+        self.assertEqual(1, obj.tally[self.Crossing])
+        obj.set_state(self.Crossing.walking)
+        self.assertEqual(2, obj.tally["Crossing"])
+        self.assertEqual({"Crossing": 2}, dict(obj.tally))
+        self.assertIsInstance(obj.get_tally(self.Crossing), Tally)
+        self.assertIsNone(obj.get_tally(int))
+
+    def test_aging(self):
+        obj = self.Pedestrian()
+        self.assertEqual(0, obj.age(self.Crossing))
+        obj.state = self.Crossing.waiting
+        Tallied.clock = 5
+        obj.state = self.Crossing.waiting
+        self.assertEqual(5, obj.age(self.Crossing))
+
+        obj.state = self.Crossing.walking
+        self.assertEqual(0, obj.age(self.Crossing))
+        obj.clock = 8
+        self.assertEqual(3, obj.age(self.Crossing))
+        self.assertEqual(5, self.Pedestrian().clock)
+
+    def test_memory(self):
+        obj = self.Pedestrian()
+        frame = {
+            Model.Line: [], Model.Audio: [], Model.Still: [], Model.Video: [],
+            Model.Property: [], Model.Condition: [],
+            Model.Memory: [
+                Model.Memory(obj, None, self.Crossing.running, "", "", None, 0)
+            ],
+        }
+        Presenter(None).animate(frame)
+        self.assertEqual(self.Crossing.running, obj.get_state(self.Crossing))
+        self.assertEqual(1, obj.tally["Crossing"])
+        self.assertEqual(1, len(obj.memories))
+
+
+class NetTests(unittest.TestCase):
+
+    class Light(enum.Enum):
+        red = enum.auto()
+        green = enum.auto()
+        amber = enum.auto()
+
+        __transitions__ = [("red", "green", 4), ("green", "amber", 6), ("amber", "red", 1)]
+
+    class Walker(enum.Enum):
+        waiting = enum.auto()
+        walking = enum.auto()
+        arrived = enum.auto()
+
+    class Thing(Tallied, DataObject):
+        pass
+
+    def setUp(self):
+        Tallied.clock = 0
+        self.light = self.Thing(name="light")
+        self.light.state = self.Light.red
+        self.Walker.__transitions__ = [
+            ("waiting", "walking", 0, lambda x: self.light.get_state(self.Light) == self.Light.green),
+            ("walking", "arrived", 5),
+        ]
+
+    def tearDown(self):
+        Tallied.clock = 0
+        del self.Walker.__transitions__
+
+    def test_table(self):
+        net = Net(self.Light, self.Walker)
+        self.assertEqual(5, len(net.table))
+        self.assertEqual(self.Light.green, net.table[self.Light.red][0].target)
+        self.assertEqual(4, net.delays[self.Light.red])
+        self.assertNotIn(self.Walker.arrived, net.table)
+
+    def test_cycle(self):
+        net = Net(self.Light)
+        states = []
+        for n in range(14):
+            net.step([self.light])
+            states.append(self.light.get_state(self.Light))
+        self.assertEqual(
+            [self.Light.red] * 4 + [self.Light.green] * 6 + [self.Light.amber] + [self.Light.red] * 3,
+            states
+        )
+
+    def test_two_phase(self):
+        net = Net(self.Light, self.Walker)
+        walker = self.Thing(name="walker")
+        walker.state = self.Walker.waiting
+        for n in range(4):
+            net.step([self.light, walker])
+
+        firings = net.step([self.light, walker])
+        self.assertEqual([self.light], [i.entity for i in firings])
+        self.assertEqual(self.Walker.waiting, walker.get_state(self.Walker))
+
+        firings = net.step([self.light, walker])
+        self.assertEqual([walker], [i.entity for i in firings])
+        self.assertEqual(self.Walker.walking, walker.get_state(self.Walker))
+
+    def test_calendar(self):
+        rng = random.Random(0)
+        entities = [self.Thing(name=n) for n in range(24)]
+        for entity in entities:
+            entity.set_state(rng.choice(list(self.Light)), rng.choice(list(self.Walker)))
+        copies = [self.Thing(name=n) for n in range(24)]
+        for entity, copy in zip(entities, copies):
+            copy.set_state(entity.get_state(self.Light), entity.get_state(self.Walker))
+
+        def snapshot(items):
+            return [(i.get_state(self.Light), i.get_state(self.Walker)) for i in items]
+
+        net = Net(self.Light, self.Walker)
+        expected = []
+        for n in range(40):
+            net.step(entities + [self.light])
+            expected.append(snapshot(entities))
+
+        Tallied.clock = 0
+        self.light.set_state(self.Light.amber).set_state(self.Light.red)
+        net.add(*copies, self.light)
+        for n in range(40):
+            net.tick()
+            with self.subTest(n=n):
+                self.assertEqual(expected[n], snapshot(copies))
+
+    def test_clock_jump(self):
+        net = Net(self.Light)
+        net.add(self.light)
+        Tallied.clock += 5
+        firings = net.tick()
+        self.assertEqual([self.light], [i.entity for i in firings])
+        self.assertEqual(self.Light.green, self.light.get_state(self.Light))
+        self.assertFalse([i for i in net.due if i < Tallied.clock])
+
+        net.step([])
+        net.step([])
+        for n in range(4):
+            net.tick()
+        self.assertEqual(self.Light.amber, self.light.get_state(self.Light))
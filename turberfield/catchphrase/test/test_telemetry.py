@@ -0,0 +1,128 @@
+#!/usr/bin/env python3
+# encoding: UTF-8
+
+# This file is part of turberfield.
+#
+# Turberfield is free software: you can redistribute it and/or modify it
+# under the terms of the GNU General Public License as published
+# by the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# Turberfield is distributed in the hope that it will be useful, but
+# WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with turberfield.  If not, see <http://www.gnu.org/licenses/>.
+
+import logging
+import textwrap
+import time
+import unittest
+
+from turberfield.catchphrase import telemetry
+from turberfield.catchphrase.presenter import Presenter
+from turberfield.catchphrase.render import Renderer
+from turberfield.catchphrase.test.test_mediator import Trivial
+
+
+class TelemetryTests(unittest.TestCase):
+
+    def setUp(self):
+        self.collector = telemetry.register(telemetry.Collector())
+
+    def tearDown(self):
+        telemetry.unregister(self.collector)
+
+    def test_disabled(self):
+        telemetry.unregister(self.collector)
+        self.assertIs(telemetry.disabled, telemetry.span("test"))
+        with telemetry.span("test"):
+            pass
+        self.assertFalse(self.collector.spans)
+
+    def test_turn(self):
+        mediator = Trivial("do_this", "do_that", "do_tother")
+        fn, args, kwargs = mediator.interpret(mediator.match("that?"))
+        data = mediator(fn, *args, **kwargs)
+        presenter = Presenter.build_from_text(textwrap.dedent("""
+        Scene
+        =====
+
+        Shot
+        ----
+
+        Caw.
+
+        """))
+        frame = presenter.animate(presenter.frames[0])
+        Renderer.render_animated_frame_to_html(frame)
+        list(Renderer.render_frame_to_terminal(frame))
+
+        self.assertEqual(
+            {
+                "parser.expand_commands", "mediator.match", "mediator.call", "presenter.animate",
+                "renderer.render_animated_frame_to_html", "renderer.render_frame_to_terminal",
+            },
+            set(self.collector.spans)
+        )
+        self.assertEqual(3, len(self.collector.spans["parser.expand_commands"]))
+        self.assertTrue(all(i >= 0 for i in self.collector.spans["mediator.match"]))
+        self.assertEqual(3, self.collector.counters["parser.phrases"])
+        self.assertEqual(3, self.collector.counters["mediator.options"])
+
+    def test_generator(self):
+
+        @telemetry.timed("test")
+        def produce():
+            for n in range(3):
+                yield n
+
+        rv = []
+        for n in produce():
+            time.sleep(0.02)
+            rv.append(n)
+
+        self.assertEqual([0, 1, 2], rv)
+        self.assertEqual(1, len(self.collector.spans["test"]))
+        self.assertLess(self.collector.spans["test"][0], 0.02)
+
+    def test_generator_closed(self):
+
+        @telemetry.timed("test")
+        def produce():
+            yield from range(3)
+
+        gen = produce()
+        self.assertEqual(0, next(gen))
+        gen.close()
+        self.assertEqual(1, len(self.collector.spans["test"]))
+
+    def test_stream_consumer(self):
+        presenter = Presenter.build_from_text("Caw.\n\nCaw, caw.\n")
+        frame = presenter.animate(presenter.frames[0])
+        for chunk in Renderer.stream_body_html(frame):
+            time.sleep(0.01)
+        self.assertLess(self.collector.spans["renderer.stream_body_html"][0], 0.01)
+
+    def test_callback(self):
+        rv = []
+        sink = telemetry.register(telemetry.Callback(lambda *args: rv.append(args)))
+        try:
+            with telemetry.span("test"):
+                telemetry.count("test")
+        finally:
+            telemetry.unregister(sink)
+        self.assertEqual(("count", "test", 1), rv[0])
+        self.assertEqual(("span", "test"), rv[1][:2])
+
+    def test_logging(self):
+        sink = telemetry.register(telemetry.LoggingSink())
+        try:
+            with self.assertLogs("turberfield.catchphrase.telemetry", level=logging.DEBUG) as logs:
+                with telemetry.span("test"):
+                    pass
+        finally:
+            telemetry.unregister(sink)
+        self.assertIn("test", logs.output[0])
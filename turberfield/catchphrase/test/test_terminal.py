@@ -0,0 +1,91 @@
+#!/usr/bin/env python3
+# encoding: UTF-8
+
+# This file is part of turberfield.
+#
+# Turberfield is free software: you can redistribute it and/or modify it
+# under the terms of the GNU General Public License as published
+# by the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# Turberfield is distributed in the hope that it will be useful, but
+# WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with turberfield.  If not, see <http://www.gnu.org/licenses/>.
+
+import asyncio
+import textwrap
+import unittest
+
+from turberfield.catchphrase.presenter import Presenter
+from turberfield.catchphrase.terminal import serve
+from turberfield.catchphrase.terminal import Terminal
+
+
+class Buffer:
+
+    def __init__(self):
+        self.items = []
+
+    def write(self, data):
+        self.items.append((asyncio.get_running_loop().time(), data))
+
+    async def drain(self):
+        pass
+
+
+class TerminalTests(unittest.IsolatedAsyncioTestCase):
+
+    text = textwrap.dedent("""
+    Scene
+    =====
+
+    Shot
+    ----
+
+    Caw.
+
+    Caw, caw, caw.
+
+    """)
+
+    @staticmethod
+    def factory():
+        def turn(text):
+            presenter = Presenter.build_from_text(TerminalTests.text)
+            return [presenter.animate(frame, dwell=0.3, pause=1) for frame in presenter.frames]
+        return turn
+
+    async def test_pacing(self):
+        buf = Buffer()
+        terminal = Terminal(buf, speed=20)
+        frame = self.factory()("")[0]
+        loop = asyncio.get_running_loop()
+        start = loop.time()
+        await terminal.write_frame(frame)
+        finish = loop.time()
+
+        self.assertEqual([b"Caw.\n", b"Caw, caw, caw.\n"], [i[1] for i in buf.items])
+        self.assertGreaterEqual(buf.items[1][0] - start, 1 / 20)
+        self.assertGreaterEqual(finish - start, (1 + 1.6) / 20)
+
+    async def test_sessions(self):
+        server = await serve(self.factory, speed=100, prompt="")
+        host, port = server.sockets[0].getsockname()[:2]
+
+        async def client():
+            reader, writer = await asyncio.open_connection(host, port)
+            writer.write(b"look\n")
+            rv = [await reader.readline(), await reader.readline()]
+            writer.close()
+            await writer.wait_closed()
+            return rv
+
+        async with server:
+            rv = await asyncio.gather(*(client() for i in range(8)))
+
+        self.assertEqual(8, len(rv))
+        self.assertTrue(all(i == [b"Caw.\n", b"Caw, caw, caw.\n"] for i in rv), rv)
@@ -0,0 +1,96 @@
+#!/usr/bin/env python3
+# encoding: UTF-8
+
+# This file is part of turberfield.
+#
+# Turberfield is free software: you can redistribute it and/or modify it
+# under the terms of the GNU General Public License as published
+# by the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# Turberfield is distributed in the hope that it will be useful, but
+# WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with turberfield.  If not, see <http://www.gnu.org/licenses/>.
+
+import contextlib
+import io
+import unittest
+
+from turberfield.catchphrase.mediator import Mediator
+from turberfield.catchphrase.vocabulary import analyse
+from turberfield.catchphrase.vocabulary import commands
+from turberfield.catchphrase import vocabulary
+from turberfield.dialogue.types import DataObject
+
+
+class Thing(DataObject):
+    pass
+
+
+ensemble = [Thing(names=["box"]), Thing(names=["bag"])]
+
+
+class Story(Mediator):
+
+    def do_look(self, this, text, context):
+        """
+        look | look around
+        search | search the box
+
+        """
+        return "You look."
+
+    def do_examine(self, this, text, context, obj: Thing):
+        """
+        look at the {obj.names[0]}
+        search {obj.names[0]} | look {obj.names[0]}
+
+        """
+        return "You examine it."
+
+    def do_open(self, this, text, context, obj: Thing):
+        """
+        open {obj.names[0]}
+
+        """
+        return "You open it."
+
+
+class VocabularyTests(unittest.TestCase):
+
+    def test_commands(self):
+        self.assertEqual(["do_examine", "do_look", "do_open"], commands(Story))
+
+    def test_analyse(self):
+        mediator = Story(*commands(Story))
+        rv = {i.method: i for i in analyse(mediator, ensemble)}
+        self.assertEqual(4, rv["do_look"].phrases)
+        self.assertEqual(6, rv["do_examine"].phrases)
+        self.assertEqual(2, rv["do_open"].phrases)
+        self.assertTrue(all(i.bytes > 0 for i in rv.values()))
+        self.assertFalse(rv["do_open"].collisions)
+        self.assertEqual(["search box"], rv["do_look"].collisions)
+        self.assertEqual(["search box"], rv["do_examine"].collisions)
+
+    def test_collision_same_phrase(self):
+        mediator = Story("do_examine")
+        rv = list(analyse(mediator, [Thing(names=["box"]), Thing(names=["box"])]))
+        self.assertEqual(3, len(rv[0].collisions))
+
+    def test_main(self):
+        args = vocabulary.parser().parse_args([
+            "turberfield.catchphrase.test.test_vocabulary:Story",
+            "--ensemble", "turberfield.catchphrase.test.test_vocabulary:ensemble",
+            "--max-total", "12",
+        ])
+        out, err = io.StringIO(), io.StringIO()
+        with contextlib.redirect_stdout(out), contextlib.redirect_stderr(err):
+            self.assertEqual(0, vocabulary.main(args))
+            args.max_phrases = 4
+            self.assertEqual(1, vocabulary.main(args))
+        self.assertIn("do_examine expands to 6 phrases", err.getvalue())
+        self.assertIn("total", out.getvalue())
@@ -0,0 +1,95 @@
+#!/usr/bin/env python3
+# encoding: UTF-8
+
+# This file is part of turberfield.
+#
+# Turberfield is free software: you can redistribute it and/or modify it
+# under the terms of the GNU General Public License as published
+# by the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# Turberfield is distributed in the hope that it will be useful, but
+# WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with turberfield.  If not, see <http://www.gnu.org/licenses/>.
+
+import gc
+import multiprocessing
+import os
+import pathlib
+import tempfile
+import unittest
+
+from turberfield.catchphrase.mediator import Mediator
+from turberfield.catchphrase.parser import CommandParser
+from turberfield.catchphrase.presenter import Presenter
+from turberfield.catchphrase import worker
+from turberfield.dialogue.model import SceneScript
+
+
+def double(n, text):
+    return 2 * n, Presenter.load_dialogue(None, text)
+
+
+def fail(n, limit):
+    if n >= limit:
+        raise ValueError(n)
+    return n
+
+
+def crash(n, code):
+    if n:
+        os._exit(code)
+    return n
+
+
+@unittest.skipUnless("fork" in multiprocessing.get_all_start_methods(), "Requires fork")
+class WorkerTests(unittest.TestCase):
+
+    def tearDown(self):
+        gc.unfreeze()
+        Presenter.load_dialogue.cache_clear()
+
+    def test_preload(self):
+        with tempfile.TemporaryDirectory() as parent:
+            path = pathlib.Path(parent, "dialogue.rst")
+            path.write_text("Caw.", encoding="utf-8")
+            folder = SceneScript.Folder(pkg=None, description="", metadata={}, paths=[str(path)], interludes=None)
+            rv = worker.preload([folder])
+            self.assertEqual([folder], rv)
+            self.assertGreater(gc.get_freeze_count(), 0)
+            self.assertEqual(1, Presenter.load_dialogue.cache_info().currsize)
+
+            results = worker.fork(double, str(path), workers=3)
+
+        self.assertEqual([0, 1, 2], [i[0] for i in results])
+        self.assertEqual([(0, "Caw."), (2, "Caw."), (4, "Caw.")], [i[1] for i in results])
+        self.assertTrue(all(i[2]["MaxRss"] > 0 for i in results))
+
+    def test_preload_mediators(self):
+
+        class Story(Mediator):
+
+            def look(self, this, text, context):
+                """
+                look
+                """
+
+        CommandParser.compile_function.cache_clear()
+        worker.preload([], [Story])
+        self.assertEqual(1, CommandParser.compile_function.cache_info().currsize)
+
+
+    def test_fork_error(self):
+        with self.assertRaises(RuntimeError) as context:
+            worker.fork(fail, 1, workers=2)
+        self.assertIsInstance(context.exception.__cause__, ValueError)
+        self.assertEqual([(0, 0), (1, 1)], [i[:2] for i in worker.fork(fail, 2, workers=2)])
+
+    def test_fork_exit(self):
+        with self.assertRaises(RuntimeError) as context:
+            worker.fork(crash, 3, workers=2)
+        self.assertIn("code 3", str(context.exception))
@@ -0,0 +1,149 @@
+#!/usr/bin/env python3
+# encoding: UTF-8
+
+# This file is part of turberfield.
+#
+# Turberfield is free software: you can redistribute it and/or modify it
+# under the terms of the GNU General Public License as published
+# by the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# Turberfield is distributed in the hope that it will be useful, but
+# WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with turberfield.  If not, see <http://www.gnu.org/licenses/>.
+
+import argparse
+from collections import defaultdict
+from collections import namedtuple
+import importlib
+import inspect
+import sys
+import time
+
+from turberfield.catchphrase.mediator import Mediator
+from turberfield.catchphrase.parser import CommandParser
+
+__doc__ = """
+Report the vocabulary of a Mediator class.
+
+For each method, show the number of phrases it expands to, their approximate memory footprint,
+the time taken to expand them, and the phrases which it shares with other methods or arguments.
+
+Usage::
+
+    catchphrase-vocab mypackage.story:Story --ensemble mypackage.story:ensemble --max-phrases 10000
+
+The ensemble may be a sequence, or a callable which returns one.
+The command exits with status 1 if any threshold is exceeded.
+
+"""
+
+Report = namedtuple("Report", ["method", "phrases", "bytes", "seconds", "collisions"])
+
+
+def footprint(phrases):
+    """Return the approximate size in bytes of the phrase table for a method."""
+    seen = set()
+    rv = sys.getsizeof(phrases)
+    for item in phrases:
+        for obj in (item, item[0], item[1], item[1][1]):
+            if id(obj) not in seen:
+                seen.add(id(obj))
+                rv += sys.getsizeof(obj)
+    return rv
+
+
+def analyse(mediator, ensemble=[]):
+    """Generate a Report for each active method of a mediator, ordered by name."""
+    table = defaultdict(set)
+    results = []
+    for fn in sorted(mediator.active, key=lambda x: x.__name__):
+        start = time.perf_counter()
+        phrases = list(CommandParser.expand_commands(fn, ensemble, parent=mediator))
+        seconds = time.perf_counter() - start
+        for phrase, (method, kwargs) in phrases:
+            table[phrase].add((method.__name__, tuple(sorted((k, id(v)) for k, v in kwargs.items()))))
+        results.append((fn.__name__, phrases, seconds))
+
+    for name, phrases, seconds in results:
+        collisions = sorted({phrase for phrase, _ in phrases if len(table[phrase]) > 1})
+        yield Report(name, len(phrases), footprint(phrases), seconds, collisions)
+
+
+def commands(cls):
+    """Return the names of methods declared on a Mediator subclass which define commands."""
+    return [
+        name for name, fn in inspect.getmembers(cls, inspect.isfunction)
+        if fn.__doc__ and not hasattr(Mediator, name)
+    ]
+
+
+def load(spec):
+    module_name, _, attr = spec.partition(":")
+    rv = importlib.import_module(module_name)
+    for name in filter(None, attr.split(".")):
+        rv = getattr(rv, name)
+    return rv
+
+
+def main(args):
+    cls = load(args.mediator)
+    ensemble = load(args.ensemble) if args.ensemble else []
+    ensemble = list(ensemble() if callable(ensemble) else ensemble)
+    mediator = cls(*(args.active or commands(cls)))
+
+    reports = list(analyse(mediator, ensemble))
+    total = sum(i.phrases for i in reports)
+    rv = 0
+    print("{0:<32} {1:>10} {2:>12} {3:>10} {4:>10}".format(
+        "method", "phrases", "bytes", "ms", "collisions"), file=sys.stdout
+    )
+    for report in reports:
+        print("{0.method:<32} {0.phrases:>10} {0.bytes:>12} {1:>10.2f} {2:>10}".format(
+            report, 1000 * report.seconds, len(report.collisions)), file=sys.stdout
+        )
+        if args.verbose:
+            for phrase in report.collisions:
+                print("    {0}".format(phrase), file=sys.stdout)
+        if args.max_phrases is not None and report.phrases > args.max_phrases:
+            print("{0.method} expands to {0.phrases} phrases.".format(report), file=sys.stderr)
+            rv = 1
+        if args.max_collisions is not None and len(report.collisions) > args.max_collisions:
+            print("{0.method} has {1} colliding phrases.".format(report, len(report.collisions)), file=sys.stderr)
+            rv = 1
+
+    print("{0:<32} {1:>10}".format("total", total), file=sys.stdout)
+    if args.max_total is not None and total > args.max_total:
+        print("Vocabulary totals {0} phrases.".format(total), file=sys.stderr)
+        rv = 1
+    return rv
+
+
+def parser():
+    rv = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    rv.add_argument("mediator", help="Import path of a Mediator class, eg: 'mypackage.story:Story'.")
+    rv.add_argument("--ensemble", default=None, help="Import path of an ensemble sequence or callable.")
+    rv.add_argument(
+        "--active", nargs="*", default=None,
+        help="Names of methods to activate [all declared with docstrings]."
+    )
+    rv.add_argument("--max-phrases", type=int, default=None, help="Fail if a method has more phrases.")
+    rv.add_argument("--max-total", type=int, default=None, help="Fail if all methods have more phrases.")
+    rv.add_argument("--max-collisions", type=int, default=None, help="Fail if a method has more collisions.")
+    rv.add_argument("-v", "--verbose", action="store_true", default=False, help="List colliding phrases.")
+    return rv
+
+
+def run():
+    p = parser()
+    args = p.parse_args()
+    rv = main(args)
+    sys.exit(rv)
+
+
+if __name__ == "__main__":
+    run()
@@ -0,0 +1,135 @@
+#!/usr/bin/env python3
+# encoding: UTF-8
+
+# This file is part of turberfield.
+#
+# Turberfield is free software: you can redistribute it and/or modify it
+# under the terms of the GNU General Public License as published
+# by the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# Turberfield is distributed in the hope that it will be useful, but
+# WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with turberfield.  If not, see <http://www.gnu.org/licenses/>.
+
+import gc
+import multiprocessing
+import queue
+import resource
+
+__doc__ = """
+Run several worker processes which share story assets loaded once by their parent.
+
+The parent calls `preload` to read dialogue, decorate folders and compile the grammar of Mediator classes.
+The preloaded objects are then moved out of the reach of the garbage collector, so that
+collections in the workers do not write to the memory pages they share with the parent.
+Workers are forked, and share those pages copy-on-write.
+Reference counts are still updated when a worker reads an object, so some pages will be copied.
+
+This module relies on the `fork` start method, which is available on POSIX only.
+
+"""
+
+
+def preload(folders=[], mediators=[]):
+    """
+    Load and prepare story assets in the current process, then freeze all tracked objects.
+
+    Dialogue text is stored in the cache of `Presenter.load_dialogue`.
+    Folders from a package are decorated with the time spans of their scenes.
+    Mediator classes compile the grammar of their methods.
+    Return the folders.
+
+    """
+    from turberfield.catchphrase.matcher import MultiMatcher
+    from turberfield.catchphrase.presenter import Presenter
+
+    for mediator in mediators:
+        mediator.compile()
+
+    rv = []
+    for folder in folders:
+        for path in folder.paths or []:
+            Presenter.load_dialogue(folder.pkg, path)
+        if folder.pkg:
+            folder = MultiMatcher.decorate_folder(
+                folder, folder.metadata.get("min_t"), folder.metadata.get("max_t")
+            )
+        rv.append(folder)
+
+    gc.collect()
+    gc.freeze()
+    return rv
+
+
+def memory():
+    """
+    Return a dictionary of memory use by the current process in kB.
+
+    `Rss` counts all resident pages. `Pss` divides shared pages among the processes which share them.
+    Where /proc is not available, only the peak `MaxRss` is reported.
+
+    """
+    rv = {}
+    try:
+        with open("/proc/self/smaps_rollup", "r") as data:
+            for line in data:
+                key, _, value = line.partition(":")
+                if key in ("Rss", "Pss", "Shared_Clean", "Shared_Dirty", "Private_Clean", "Private_Dirty"):
+                    rv[key] = int(value.split()[0])
+    except OSError:
+        pass
+    rv["MaxRss"] = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return rv
+
+
+def run(n, target, args, results):
+    try:
+        rv = target(n, *args)
+    except Exception as e:
+        rv = e
+    results.put((n, rv, memory()))
+
+
+def fork(target, *args, workers=2, interval=0.1):
+    """
+    Fork worker processes which each call target with their number and args.
+    Return a list of (number, result, memory) for each worker once all have finished.
+
+    If the target raises an exception, it is raised again in the parent as the cause of a RuntimeError.
+    A RuntimeError is also raised if a worker exits without a result. Remaining workers are then terminated.
+
+    """
+    context = multiprocessing.get_context("fork")
+    results = context.Queue()
+    procs = [context.Process(target=run, args=(n, target, args, results)) for n in range(workers)]
+    for proc in procs:
+        proc.start()
+
+    rv = {}
+    try:
+        while len(rv) < workers:
+            try:
+                n, result, usage = results.get(timeout=interval)
+            except queue.Empty:
+                dead = [n for n, proc in enumerate(procs) if n not in rv and proc.exitcode is not None]
+                if dead and results.empty():
+                    raise RuntimeError("Worker {0} exited with code {1}".format(dead[0], procs[dead[0]].exitcode))
+            else:
+                rv[n] = (n, result, usage)
+    except BaseException:
+        for proc in procs:
+            proc.terminate()
+        raise
+    finally:
+        for proc in procs:
+            proc.join()
+
+    for n, result, usage in rv.values():
+        if isinstance(result, Exception):
+            raise RuntimeError("Worker {0} failed".format(n)) from result
+    return [rv[n] for n in sorted(rv)]